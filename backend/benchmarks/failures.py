@@ -0,0 +1,145 @@
+# Failed turn check: when the model errors mid-turn, both conversation endpoints
+# must roll the session back (in memory and in the journal), and the next turn
+# must still work.
+#
+#   cd backend && python -m benchmarks.failures
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+from benchmarks.stub_ollama import ScriptedReply, StubOllama
+
+TOOL_CALL = ScriptedReply(
+    tool_calls=[{"name": "get_to_do_list_remaining_items", "arguments": {}}]
+)
+FAILURE = ScriptedReply(content="model crashed", status=500)
+
+
+def _roles(messages: list[Any]) -> list[str]:
+    # Works on Messages and on the journal's plain dicts
+    return [
+        message.get("role")
+        + (
+            "+tools"
+            if message.get("role") == "assistant" and message.get("tool_calls")
+            else ""
+        )
+        for message in messages
+    ]
+
+
+async def _post(client: Any, endpoint: str, session_id: str) -> int:
+    import httpx
+
+    body = {"prompt": "Lola, what's left on my list?", "session_id": session_id}
+    try:
+        async with client.stream("POST", endpoint, json=body) as response:
+            async for _ in response.aiter_lines():
+                pass
+            return response.status_code
+    except httpx.HTTPError:
+        # A streamed turn that fails after its headers just drops the connection
+        return 0
+
+
+async def _check(stub: StubOllama, base_url: str, secret: str) -> list[str]:
+    import httpx
+
+    from src.agent.models.conversation import sessions
+    from src.agent.models.journal import conversation_journal
+
+    failures: list[str] = []
+    # uvicorn drops the connection after an unhandled error, so don't reuse one
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"x-secret": secret, "connection": "close"},
+        timeout=None,
+    ) as client:
+        while (await client.get("/api/ready")).status_code != 200:
+            await asyncio.sleep(0.05)
+
+        for endpoint in ["/api/conversation", "/api/conversation/stream"]:
+            # The streamed endpoint records messages as they arrive, so it keeps
+            # the tool calls that already ran, like an interrupted turn does
+            ran_tools = (
+                ["user", "assistant+tools", "tool"]
+                if endpoint.endswith("stream")
+                else []
+            )
+            for name, replies, kept in [
+                ("first call fails", [FAILURE], []),
+                ("call after a tool fails", [TOOL_CALL, FAILURE], ran_tools),
+            ]:
+                session_id = f"{endpoint}-{name}"
+                stub.script([ScriptedReply(content="Hi.")])
+                await _post(client, endpoint, session_id)
+                before = _roles(sessions.get(session_id).history)
+
+                stub.script(replies)
+                status = await _post(client, endpoint, session_id)
+                if status == 200:
+                    failures.append(f"{endpoint} {name}: failed turn returned 200")
+
+                after = _roles(sessions.get(session_id).history)
+                if after != before + kept:
+                    failures.append(f"{endpoint} {name}: history is {after}")
+                journaled = conversation_journal.replay().get(session_id)
+                if (
+                    journaled is None
+                    or ["system", *_roles(journaled.messages)] != after
+                ):
+                    failures.append(f"{endpoint} {name}: journal out of sync")
+
+                stub.script([ScriptedReply(content="Nothing left.")])
+                status = await _post(client, endpoint, session_id)
+                if status != 200:
+                    failures.append(f"{endpoint} {name}: next turn returned {status}")
+                history = _roles(sessions.get(session_id).history)
+                if history[-2:] != ["user", "assistant"]:
+                    failures.append(f"{endpoint} {name}: next turn not recorded")
+    return failures
+
+
+def main():
+    stub = StubOllama(prompt_eval_delay=0, token_delay=0).start()
+
+    os.environ["OLLAMA_HOST"] = stub.url
+    os.environ.setdefault("LLM", "stub")
+    os.environ.setdefault("REASONING_LLM", "stub-reasoning")
+    data = tempfile.mkdtemp()
+    os.environ["TODO_DB_PATH"] = os.path.join(data, "todos.db")
+    os.environ["JOURNAL_PATH"] = os.path.join(data, "journal")
+    os.environ["WARMUP_ENABLED"] = "false"
+    os.environ["INTENT_FAST_PATH"] = "false"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+    import uvicorn
+
+    from main import app
+    from src.settings.settings import settings
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="critical")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    failures = asyncio.run(_check(stub, f"http://127.0.0.1:{port}", settings.secret))
+
+    server.should_exit = True
+    stub.stop()
+
+    print(f"4 failed turns, {len(failures)} problems")
+    for failure in failures:
+        print(f"  {failure}")
+    if len(failures) > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
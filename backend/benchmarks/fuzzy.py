@@ -0,0 +1,88 @@
+# Fuzzy matching regression check: the trigram-shortlisted find_similar must
+# pick a match as good as an exhaustive scan over every candidate.
+#
+#   cd backend && python -m benchmarks.fuzzy --contacts 3000 --queries 500
+import argparse
+import random
+import string
+
+from src.utils import find_similar, levenshtein_distance
+
+FIRST_NAMES = [
+    "Alice", "Bob", "Carol", "Dan", "Eve", "Frank", "Grace", "Heidi", "Ivan",
+    "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent",
+    "Victor", "Walter", "Yasmin", "Zoe", "Ana", "Ion", "Maria", "Andrei",
+]  # fmt: skip
+SURNAMES = [
+    "Lee", "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson",
+    "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Popescu", "Ionescu",
+]  # fmt: skip
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fuzzy index vs exhaustive scan")
+    parser.add_argument("--contacts", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def exhaustive(candidates: list[str], key: str) -> float:
+    return max(levenshtein_distance(key, candidate.lower()) for candidate in candidates)
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    position = rng.randrange(len(text))
+    edit = rng.choice(["drop", "swap", "replace"])
+    if edit == "drop":
+        return text[:position] + text[position + 1 :]
+    if edit == "swap" and position < len(text) - 1:
+        return (
+            text[:position] + text[position + 1] + text[position] + text[position + 2 :]
+        )
+    return text[:position] + rng.choice(string.ascii_lowercase) + text[position + 1 :]
+
+
+def _contacts(count: int, rng: random.Random) -> list[str]:
+    contacts = {
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}{rng.choice(['', ' Jr', ' 2'])}"
+        for _ in range(count * 2)
+    }
+    return [*sorted(contacts)][:count] + [*FIRST_NAMES]
+
+
+def _check(candidates: list[str], key: str) -> str | None:
+    found, similarity = find_similar(candidates, key, str.lower)
+    best = exhaustive(candidates, key)
+    if similarity is None or similarity < best:
+        return f"{key!r}: got {found!r} ({similarity}), exhaustive best is {best}"
+    return None
+
+
+def main():
+    args = _parse_args()
+    rng = random.Random(args.seed)
+    failures: list[str] = []
+
+    alices = [f"Alice {surname}" for surname in SURNAMES[:18]] + ["Alice"]
+    failures += [failure for failure in [_check(alices, "alice")] if failure]
+
+    for size in [10, 100, args.contacts]:
+        candidates = _contacts(size, rng)
+        for _ in range(args.queries):
+            name = rng.choice(candidates).lower()
+            key = rng.choice([name, name.split(" ")[0], _typo(name, rng)])
+            failure = _check(candidates, key)
+            if failure is not None:
+                failures.append(f"[{len(candidates)} contacts] {failure}")
+
+    print(f"{3 * args.queries + 1} queries, {len(failures)} worse than exhaustive")
+    for failure in failures:
+        print(f"  {failure}")
+    if len(failures) > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Device isolation load test: many devices with their own contacts talk to the
+# app at once, and every answer must only contain the caller's own data.
+#
+#   cd backend && python -m benchmarks.isolation --devices 16 --turns 5 --stream
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any
+
+from benchmarks.stub_ollama import ScriptedReply, StubOllama
+
+PROMPT = "Lola, send a WhatsApp message to Alice saying I'm on my way."
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Concurrent device isolation test")
+    parser.add_argument("--devices", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--prompt-eval-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    return parser.parse_args()
+
+
+def _phone_number(device: int) -> str:
+    return f"+4000{device:06d}"
+
+
+def _respond(request: dict[str, Any]) -> ScriptedReply:
+    # Calls the tool for a fresh prompt, then echoes the tool result back, so
+    # the answer carries whichever phone number the tool resolved.
+    last_message = request["messages"][-1]
+    if last_message["role"] == "user":
+        return ScriptedReply(
+            tool_calls=[
+                {
+                    "name": "send_whatsapp_message",
+                    "arguments": {"to": "Alice", "message": "I'm on my way."},
+                }
+            ],
+            prompt_eval_delay=random.uniform(0, 0.05),
+        )
+    return ScriptedReply(content=f"Done: {last_message['content']}")
+
+
+async def _device(
+    client: Any, endpoint: str, device: int, *, devices: int, turns: int
+) -> list[str]:
+    session_id = uuid.uuid4().hex
+    own = _phone_number(device)
+    others = [_phone_number(other) for other in range(devices) if other != device]
+    failures: list[str] = []
+    for turn in range(turns):
+        await asyncio.sleep(random.uniform(0, 0.05))
+        body = {
+            "prompt": PROMPT,
+            "session_id": session_id,
+            "metadata": {
+                "contacts": {"Alice": own},
+                "installedApps": ["com.whatsapp"],
+            },
+        }
+        response = await client.post(endpoint, json=body)
+        if response.status_code != 200:
+            failures.append(f"device {device} turn {turn}: HTTP {response.status_code}")
+            continue
+        if own not in response.text:
+            failures.append(f"device {device} turn {turn}: own number missing")
+        leaked = [number for number in others if number in response.text]
+        if len(leaked) > 0:
+            failures.append(f"device {device} turn {turn}: leaked {leaked}")
+    return failures
+
+
+async def _run(base_url: str, secret: str, args: argparse.Namespace) -> list[str]:
+    import httpx
+
+    endpoint = "/api/conversation/stream" if args.stream else "/api/conversation"
+    async with httpx.AsyncClient(
+        base_url=base_url, headers={"x-secret": secret}, timeout=None
+    ) as client:
+        while (await client.get("/api/ready")).status_code != 200:
+            await asyncio.sleep(0.05)
+        results = await asyncio.gather(
+            *[
+                _device(
+                    client,
+                    endpoint,
+                    device,
+                    devices=args.devices,
+                    turns=args.turns,
+                )
+                for device in range(args.devices)
+            ]
+        )
+    return [failure for failures in results for failure in failures]
+
+
+def main():
+    args = _parse_args()
+    stub = StubOllama(
+        prompt_eval_delay=args.prompt_eval_delay,
+        token_delay=args.token_delay,
+        responder=_respond,
+    ).start()
+
+    os.environ["OLLAMA_HOST"] = stub.url
+    os.environ.setdefault("LLM", "stub")
+    os.environ.setdefault("REASONING_LLM", "stub-reasoning")
+    data = tempfile.mkdtemp()
+    os.environ["TODO_DB_PATH"] = os.path.join(data, "todos.db")
+    os.environ["JOURNAL_PATH"] = os.path.join(data, "journal")
+    os.environ["INTENT_FAST_PATH"] = "false"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ["SCHEDULER_DEFAULT_CONCURRENCY"] = str(args.devices)
+    os.environ["SCHEDULER_MAX_QUEUE"] = str(args.devices)
+    os.environ["MAX_SESSIONS"] = str(max(args.devices, 64))
+
+    import uvicorn
+
+    from main import app
+    from src.settings.settings import settings
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    started = time.perf_counter()
+    failures = asyncio.run(_run(f"http://127.0.0.1:{port}", settings.secret, args))
+    elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    stub.stop()
+
+    print(
+        json.dumps(
+            {
+                "devices": args.devices,
+                "turns": args.devices * args.turns,
+                "seconds": round(elapsed, 2),
+                "llm_calls": stub.calls,
+                "failures": len(failures),
+            }
+        )
+    )
+    for failure in failures:
+        print(f"  {failure}")
+    if len(failures) > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
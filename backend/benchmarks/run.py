@@ -0,0 +1,186 @@
+# Offline latency benchmark: runs scripted conversations against the real
+# FastAPI app, with a stub Ollama (and Open-Meteo) serving scripted replies.
+#
+#   cd backend && python -m benchmarks.run --iterations 20 --stream
+import argparse
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from benchmarks.stub_ollama import ScriptedReply, StubOllama
+
+_COUNTS = {"llm calls", "prompt tokens"}
+_STAGE_SAMPLE = re.compile(r"^lola_stage_duration_seconds_(sum|count)\{(.*)\} (\S+)$")
+_LABEL = re.compile(r'(\w+)="([^"]*)"')
+_PROMPT_TOKENS = re.compile(r"^lola_llm_prompt_eval_tokens_total\S* (\S+)$")
+
+
+@dataclass
+class StageTimings:
+    samples: dict[str, list[float]] = field(default_factory=lambda: {})
+
+    def add(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    # Nearest rank: the smallest value with at least q% of samples at or below it
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+@dataclass
+class Scrape:
+    stage_seconds: dict[str, float] = field(default_factory=lambda: {})
+    stage_counts: dict[str, float] = field(default_factory=lambda: {})
+    prompt_tokens: float = 0
+
+
+def scrape(client) -> Scrape:
+    # Keys stages by name and model, summing the other labels (e.g. tool names)
+    result = Scrape()
+    for line in client.get("/metrics").text.splitlines():
+        if (match := _STAGE_SAMPLE.match(line)) is not None:
+            kind, labels, value = match.groups()
+            labels = dict(_LABEL.findall(labels))
+            stage = " ".join(
+                label for label in [labels["stage"], labels.get("model")] if label
+            )
+            totals = result.stage_seconds if kind == "sum" else result.stage_counts
+            totals[stage] = totals.get(stage, 0) + float(value)
+        elif (match := _PROMPT_TOKENS.match(line)) is not None:
+            result.prompt_tokens += float(match.group(1))
+    return result
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline agent latency benchmark")
+    parser.add_argument(
+        "--corpus",
+        default=os.path.join(os.path.dirname(__file__), "corpora", "default.json"),
+    )
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--prompt-eval-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--no-intents", action="store_true")
+    parser.add_argument(
+        "--shared-session",
+        action="store_true",
+        help="Run every iteration in one session, so history keeps growing",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    stub = StubOllama(
+        prompt_eval_delay=args.prompt_eval_delay, token_delay=args.token_delay
+    ).start()
+
+    os.environ["OLLAMA_HOST"] = stub.url
+    os.environ["WEATHER_API_URL"] = f"{stub.url}/v1/forecast"
+    os.environ.setdefault("LLM", "stub")
+    os.environ.setdefault("REASONING_LLM", "stub-reasoning")
+    data = tempfile.mkdtemp()
+    os.environ["TODO_DB_PATH"] = os.path.join(data, "todos.db")
+    os.environ["JOURNAL_PATH"] = os.path.join(data, "journal")
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    if args.no_intents:
+        os.environ["INTENT_FAST_PATH"] = "false"
+
+    import httpx
+    import uvicorn
+
+    from main import app
+    from src.settings.settings import settings
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    with open(args.corpus) as corpus_file:
+        corpus = json.load(corpus_file)
+
+    timings = StageTimings()
+    endpoint = "/api/conversation/stream" if args.stream else "/api/conversation"
+    shared_session = uuid.uuid4().hex
+    with httpx.Client(
+        base_url=f"http://127.0.0.1:{port}",
+        headers={"x-secret": settings.secret},
+        timeout=None,
+    ) as client:
+        while client.get("/api/ready").status_code != 200:
+            time.sleep(0.05)
+        for _ in range(args.iterations):
+            for conversation in corpus["conversations"]:
+                session_id = shared_session if args.shared_session else uuid.uuid4().hex
+                for turn in conversation["turns"]:
+                    stub.script([ScriptedReply(**reply) for reply in turn["replies"]])
+                    calls = stub.calls
+                    model_seconds = stub.model_seconds.get(settings.llm, 0)
+                    before = scrape(client)
+                    body = {
+                        "prompt": turn["prompt"],
+                        "metadata": turn.get("metadata", corpus["metadata"]),
+                        "session_id": session_id,
+                    }
+
+                    started = time.perf_counter()
+                    first_segment: float | None = None
+                    with client.stream("POST", endpoint, json=body) as response:
+                        for line in response.iter_lines():
+                            if first_segment is None and '"segment"' in line:
+                                first_segment = time.perf_counter() - started
+                    total = time.perf_counter() - started
+
+                    model = stub.model_seconds.get(settings.llm, 0) - model_seconds
+                    timings.add("total", total)
+                    timings.add("llm", model)
+                    timings.add("agent overhead", total - model)
+                    timings.add("llm calls", stub.calls - calls)
+                    timings.add(f"total [{conversation['name']}]", total)
+                    if first_segment is not None:
+                        timings.add("first segment", first_segment)
+
+                    after = scrape(client)
+                    timings.add(
+                        "prompt tokens", after.prompt_tokens - before.prompt_tokens
+                    )
+                    for stage, count in after.stage_counts.items():
+                        if count > before.stage_counts.get(stage, 0):
+                            timings.add(
+                                f"stage [{stage}]",
+                                after.stage_seconds[stage]
+                                - before.stage_seconds.get(stage, 0),
+                            )
+
+    server.should_exit = True
+    stub.stop()
+
+    print(f"{'stage':<32}{'n':>6}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for stage, values in timings.samples.items():
+        scale, unit = (1, "") if stage in _COUNTS else (1000, "ms")
+        print(
+            f"{stage:<32}{len(values):>6}"
+            + "".join(
+                f"{percentile(values, q) * scale:>10.1f}{unit:>2}" for q in [50, 95, 99]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
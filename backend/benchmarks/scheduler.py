@@ -0,0 +1,77 @@
+# Scheduler priority check across models: a reasoning job on its own model
+# must not start while an interactive call on the chat model is queued or
+# running, and must start once it's done.
+#
+#   cd backend && python -m benchmarks.scheduler
+import asyncio
+import time
+
+from src.agent.scheduler import Priority, Scheduler
+
+
+async def _call(
+    scheduler: Scheduler,
+    model: str,
+    priority: Priority,
+    *,
+    hold: float,
+    log: list[tuple[str, str, float]],
+    name: str,
+):
+    async with scheduler.slot(model, priority):
+        log.append((name, "start", time.perf_counter()))
+        await asyncio.sleep(hold)
+        log.append((name, "end", time.perf_counter()))
+
+
+async def _check() -> list[str]:
+    scheduler = Scheduler(concurrency={}, default_concurrency=1, max_queue=8)
+    log: list[tuple[str, str, float]] = []
+
+    # Two interactive calls on "chat" (the second one queues), then a
+    # reasoning job on "reasoning" and a background call on "chat"
+    tasks = [
+        asyncio.create_task(
+            _call(scheduler, "chat", Priority.INTERACTIVE, hold=0.1, log=log, name="a")
+        ),
+        asyncio.create_task(
+            _call(scheduler, "chat", Priority.INTERACTIVE, hold=0.1, log=log, name="b")
+        ),
+    ]
+    await asyncio.sleep(0.01)
+    tasks += [
+        asyncio.create_task(
+            _call(
+                scheduler, "reasoning", Priority.REASONING, hold=0.1, log=log, name="r"
+            )
+        ),
+        asyncio.create_task(
+            _call(scheduler, "chat", Priority.BACKGROUND, hold=0.05, log=log, name="w")
+        ),
+    ]
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+    events = {(name, event): at for name, event, at in log}
+    failures = []
+    for low in ["r", "w"]:
+        for high in ["a", "b"]:
+            if events[(low, "start")] < events[(high, "end")]:
+                failures.append(f"{low} started before interactive call {high} ended")
+    if events[("r", "start")] < events[("w", "end")]:
+        failures.append("reasoning started before the background call ended")
+    if any(count != 0 for count in scheduler._pending.values()):
+        failures.append(f"pending counts leaked: {scheduler._pending}")
+    return failures
+
+
+def main():
+    failures = asyncio.run(_check())
+    print(f"{len(failures)} scheduling violations")
+    for failure in failures:
+        print(f"  {failure}")
+    if len(failures) > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+
+@dataclass
+class ScriptedReply:
+    content: str = ""
+    tool_calls: list[dict[str, Any]] = field(default_factory=lambda: [])
+    prompt_eval_delay: float | None = None
+    token_delay: float | None = None
+    model: str | None = None
+    status: int = 200
+
+
+@dataclass
+class StubOllama:
+    prompt_eval_delay: float = 0.2
+    token_delay: float = 0.02
+    default_reply: str = "Sure. This is a scripted answer from the stub model."
+    forecast: dict[str, Any] = field(
+        default_factory=lambda: {
+            "current": {"temperature_2m": 21.5, "precipitation": 0, "is_day": 1},
+            "daily": {"temperature_2m_max": [24.1], "temperature_2m_min": [14.2]},
+        }
+    )
+    responder: Callable[[dict[str, Any]], ScriptedReply | None] | None = None
+    calls: int = 0
+    model_seconds: dict[str, float] = field(default_factory=lambda: {})
+    loaded_models: set[str] = field(default_factory=set)
+    _replies: deque[ScriptedReply] = field(default_factory=deque)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, replies: list[ScriptedReply]):
+        with self._lock:
+            self._replies.clear()
+            self._replies.extend(replies)
+
+    def _next_reply(self, model: str, request: dict[str, Any]) -> ScriptedReply:
+        with self._lock:
+            self.calls += 1
+            if self.responder is not None:
+                reply = self.responder(request)
+                if reply is not None:
+                    return reply
+            for reply in self._replies:
+                if reply.model is None or reply.model == model:
+                    self._replies.remove(reply)
+                    return reply
+        return ScriptedReply(content=self.default_reply)
+
+    def _record(self, model: str, seconds: float):
+        with self._lock:
+            self.model_seconds[model] = self.model_seconds.get(model, 0) + seconds
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "StubOllama":
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _chunk(model: str, message: dict[str, Any], *, done: bool, **stats) -> bytes:
+    payload = {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", **message},
+        "done": done,
+        **stats,
+    }
+    return (json.dumps(payload) + "\n").encode()
+
+
+def _handler(stub: StubOllama) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any):
+            pass
+
+        def _send_json(self, payload: dict[str, Any], status: int = 200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/v1/forecast"):
+                return self._send_json(stub.forecast)
+            if self.path == "/api/ps":
+                return self._send_json(
+                    {"models": [{"model": model} for model in stub.loaded_models]}
+                )
+            self.send_response(404)
+            self.end_headers()
+
+        def do_POST(self):
+            try:
+                self._chat()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _chat(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/chat":
+                return self._send_json({})
+
+            model = request.get("model", "")
+            stub.loaded_models.add(model if ":" in model else f"{model}:latest")
+            if len(request.get("messages", [])) == 0:
+                return self._send_json(
+                    json.loads(_chunk(model, {"content": ""}, done=True))
+                )
+
+            reply = stub._next_reply(model, request)
+            if reply.status != 200:
+                return self._send_json({"error": reply.content}, status=reply.status)
+            prompt_chars = len(json.dumps(request.get("messages", [])))
+            prompt_eval_delay = (
+                stub.prompt_eval_delay
+                if reply.prompt_eval_delay is None
+                else reply.prompt_eval_delay
+            )
+            token_delay = (
+                stub.token_delay if reply.token_delay is None else reply.token_delay
+            )
+            tokens = [
+                token + " " for token in reply.content.split(" ") if reply.content
+            ]
+
+            started = time.perf_counter()
+            time.sleep(prompt_eval_delay)
+            stats = {
+                "prompt_eval_count": prompt_chars // 4,
+                "prompt_eval_duration": int(prompt_eval_delay * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(len(tokens) * token_delay * 1e9),
+                "load_duration": 0,
+            }
+
+            if not request.get("stream", True):
+                time.sleep(len(tokens) * token_delay)
+                stub._record(model, time.perf_counter() - started)
+                message = {"content": "".join(tokens).strip()}
+                if reply.tool_calls:
+                    message["tool_calls"] = [
+                        {"function": tool_call} for tool_call in reply.tool_calls
+                    ]
+                return self._send_json(
+                    json.loads(
+                        _chunk(
+                            model,
+                            message,
+                            done=True,
+                            total_duration=int((time.perf_counter() - started) * 1e9),
+                            **stats,
+                        )
+                    )
+                )
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(token_delay)
+                self.wfile.write(_chunk(model, {"content": token}, done=False))
+                self.wfile.flush()
+            if reply.tool_calls:
+                self.wfile.write(
+                    _chunk(
+                        model,
+                        {
+                            "content": "",
+                            "tool_calls": [
+                                {"function": tool_call}
+                                for tool_call in reply.tool_calls
+                            ],
+                        },
+                        done=False,
+                    )
+                )
+            stub._record(model, time.perf_counter() - started)
+            self.wfile.write(
+                _chunk(
+                    model,
+                    {"content": ""},
+                    done=True,
+                    done_reason="stop",
+                    total_duration=int((time.perf_counter() - started) * 1e9),
+                    **stats,
+                )
+            )
+            self.wfile.flush()
+
+    return Handler
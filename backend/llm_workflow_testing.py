@@ -1,10 +1,12 @@
+import asyncio
 from pprint import pprint
 
 from ollama import Message
 
 from src.agent.agent import agentic_chat
-from src.agent.models.conversation import Conversation, history
-from src.agent.tools.tools import toolkits
+from src.agent.models.conversation import Conversation, current_session_id, sessions
+from src.agent.models.metadata import current_device_metadata
+from src.agent.tools.tools import load_toolkits
 from src.settings.settings import settings
 
 metadata = {
@@ -18,25 +20,32 @@ metadata = {
 
 
 def run_prompter():
+    load_toolkits(settings.toolkits_path)
     while True:
         prompt = input("[USER]: ")
         conversation = Conversation(prompt=f"lola {prompt}", metadata=metadata)
-        settings.metadata = conversation.metadata
+        current_device_metadata.set(conversation.metadata)
+        current_session_id.set(conversation.session_id)
+        session = sessions.get(conversation.session_id)
         ephemeral_history: list[Message] = []
 
         user_message = Message(role="user", content=conversation.prompt)
-        history.append(user_message)
+        session.append(user_message)
         ephemeral_history.append(user_message)
 
-        agent_messages = agentic_chat(
-            llm=settings.llm,
-            history=history,
+        turn = asyncio.run(
+            agentic_chat(
+                llm=settings.llm,
+                history=session.history,
+            )
         )
-        history.extend(agent_messages)
-        ephemeral_history.extend(agent_messages)
+        session.extend(turn.messages)
+        session.trim(max_turns=settings.session_max_turns)
+        ephemeral_history.extend(turn.messages)
 
-        answer = history[-1]
+        answer = ephemeral_history[-1]
         print(f"[LOLA]: {answer.content}")
+        print(f"[LLM CALLS]: {turn.llm_calls}")
 
         used_tools = [
             *set(
@@ -1,14 +1,60 @@
-import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from ollama import Message
 
-from src.agent.agent import agentic_chat
-from src.agent.models.conversation import Conversation, history
+from src.agent.agent import AgentTurn, agentic_chat, agentic_chat_stream
+from src.agent.jobs import Job, reasoning_jobs
+from src.agent.models.conversation import (
+    Conversation,
+    ResponseMode,
+    Session,
+    TurnInterrupted,
+    current_session_id,
+    sessions,
+)
+from src.agent.models.journal import conversation_journal
+from src.agent.models.metadata import (
+    DeviceMetadata,
+    current_device_metadata,
+    device_metadata,
+)
+from src.agent.scheduler import Priority, SchedulerFull, current_priority, scheduler
+from src.agent.tools.tools import load_toolkits
+from src.agent.utils.prompt import prompt_cache_stats
+from src.agent.warmup import warmup
+from src.metrics import log_event, metrics, span, turns_interrupted
+from src.serialization import JSONDecodeError, compress, dumps, loads, ndjson_line
 from src.settings.settings import settings
 
-app = FastAPI()
+with span("toolkit_load"):
+    load_toolkits(settings.toolkits_path)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks: list[asyncio.Task] = []
+    if settings.journal_enabled:
+        with span("journal_replay"):
+            sessions.restore(conversation_journal.replay())
+        tasks.append(asyncio.create_task(conversation_journal.run()))
+    if settings.warmup_enabled:
+        tasks.append(asyncio.create_task(warmup.run()))
+    else:
+        warmup.ready = True
+
+    yield
+    for task in tasks:
+        task.cancel()
+    if settings.journal_enabled:
+        conversation_journal.close()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,36 +64,312 @@ app.add_middleware(
 )
 
 
+def _resolve_metadata(conversation: Conversation) -> DeviceMetadata | None:
+    return device_metadata.apply(
+        conversation.session_id,
+        base_version=conversation.metadata_version,
+        sections=conversation.metadata,
+    )
+
+
+def _json_response(
+    payload: object,
+    *,
+    request: Request | None = None,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    body, headers = dumps(payload), {**(headers or {})}
+    if request is not None:
+        body, encoding = compress(
+            body,
+            accept_encoding=request.headers.get("accept-encoding", ""),
+            min_bytes=settings.compression_min_bytes,
+        )
+        headers["vary"] = "accept-encoding"
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+    return Response(
+        body, status_code=status_code, media_type="application/json", headers=headers
+    )
+
+
+def _metadata_conflict() -> Response:
+    return _json_response({"error": "metadata-version-mismatch"}, status_code=409)
+
+
+def _job_message(job: Job) -> Message:
+    if job.result is not None:
+        content = f'The answer to "{job.task}" is: {job.result}'
+    else:
+        content = f'I couldn\'t work out "{job.task}": {job.error}'
+    return Message(role="assistant", content=content)
+
+
+def _start_conversation(
+    conversation: Conversation, session: Session, metadata: DeviceMetadata
+) -> list[Message]:
+    current_device_metadata.set(metadata.sections)
+    current_session_id.set(conversation.session_id)
+    current_priority.set(Priority[conversation.priority.upper()])
+
+    print(f"USER: {conversation.prompt}")
+
+    for job in reasoning_jobs.collect_finished(conversation.session_id):
+        session.append(_job_message(job))
+
+    user_message = Message(role="user", content=conversation.prompt)
+    session.append(user_message)
+    return [user_message]
+
+
+def _rollback_turn(session: Session, start: int):
+    session.rollback(start)
+    conversation_journal.commit()
+
+
+def _log_interruption(session: Session, start: int):
+    print(f"INTERRUPTED: {len(session.history) - start} messages kept")
+    turns_interrupted.inc()
+    log_event("interrupted")
+
+
+def _log_answer(answer: Message, turn: AgentTurn):
+    print(f"LOLA: {answer.content} ({turn.llm_calls} LLM calls)")
+    log_event("answer", llm_calls=turn.llm_calls, tokens=turn.tokens)
+
+    stats = prompt_cache_stats.get(settings.llm)
+    if stats is not None and stats.calls > 0:
+        print(f"PROMPT CACHE: {stats.hit_ratio:.0%} hit ratio over {stats.calls} calls")
+
+
+def _tool_result(message: Message) -> dict | None:
+    if message.role != "tool" or not message.content:
+        return None
+    try:
+        result = loads(message.content)
+    except JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) and "archetype" in result else None
+
+
+def _serialize_messages(
+    messages: list[Message], *, response: ResponseMode
+) -> list[dict]:
+    if response == "final":
+        # The answer, plus the tool results the device has to act on
+        messages = [
+            message
+            for message in messages[:-1]
+            if (result := _tool_result(message)) is not None
+            and result["archetype"] in ["frontend-capability", "background-job"]
+        ] + messages[-1:]
+    return [{"role": message.role, "content": message.content} for message in messages]
+
+
+def _admit() -> Response | None:
+    try:
+        scheduler.admit(settings.llm)
+    except SchedulerFull as e:
+        return _json_response(
+            {"error": "too-many-requests"},
+            status_code=429,
+            headers={"retry-after": str(e.retry_after)},
+        )
+    return None
+
+
+def _interrupted(metadata: DeviceMetadata) -> Response:
+    return Response(
+        status_code=204,
+        headers={"x-metadata-version": metadata.version, "x-turn-interrupted": "true"},
+    )
+
+
 @app.post("/api/conversation")
 async def conversation(conversation: Conversation, request: Request):
     if request.headers.get("x-secret") != settings.secret:
         return Response(status_code=403)
 
-    settings.metadata = conversation.metadata
-    ephemeral_history: list[Message] = []
+    rejection = _admit()
+    if rejection is not None:
+        return rejection
 
-    print(f"USER: {conversation.prompt}")
+    metadata = _resolve_metadata(conversation)
+    if metadata is None:
+        return _metadata_conflict()
 
-    user_message = Message(role="user", content=conversation.prompt)
-    history.append(user_message)
-    ephemeral_history.append(user_message)
+    session = sessions.get(conversation.session_id)
+    generation = session.interrupt()
+    async with session.hold():
+        if session.is_stale(generation):
+            return _interrupted(metadata)
 
-    agent_messages = agentic_chat(
-        llm=settings.llm,
-        history=history,
-    )
-    history.extend(agent_messages)
-    ephemeral_history.extend(agent_messages)
+        ephemeral_history = _start_conversation(conversation, session, metadata)
+        start = len(session.history) - 1
 
-    answer = history[-1]
-    print(f"LOLA: {answer.content}")
+        try:
+            with span("turn"):
+                turn = await session.run_turn(
+                    agentic_chat(llm=settings.llm, history=session.history)
+                )
+        except TurnInterrupted:
+            _rollback_turn(session, start)
+            _log_interruption(session, start)
+            return _interrupted(metadata)
+        except BaseException:
+            _rollback_turn(session, start)
+            raise
+        session.extend(turn.messages)
+        session.trim(max_turns=settings.session_max_turns)
+        conversation_journal.commit()
+        ephemeral_history.extend(turn.messages)
 
-    return Response(
-        json.dumps(
-            [
-                {"role": message.role, "content": message.content}
-                for message in ephemeral_history
-            ]
-        ),
-        media_type="text/plain",
+        _log_answer(ephemeral_history[-1], turn)
+
+    with span("serialize"):
+        return _json_response(
+            _serialize_messages(ephemeral_history, response=conversation.response),
+            request=request,
+            headers={"x-metadata-version": metadata.version},
+        )
+
+
+@app.post("/api/conversation/stream")
+async def conversation_stream(conversation: Conversation, request: Request):
+    if request.headers.get("x-secret") != settings.secret:
+        return Response(status_code=403)
+
+    rejection = _admit()
+    if rejection is not None:
+        return rejection
+
+    metadata = _resolve_metadata(conversation)
+    if metadata is None:
+        return _metadata_conflict()
+
+    async def frames() -> AsyncIterator[bytes]:
+        # Fetched and pinned in the same step, the store may evict the session
+        # before the response starts streaming
+        session = sessions.get(conversation.session_id)
+        generation = session.interrupt()
+        async with session.hold():
+            if session.is_stale(generation):
+                yield ndjson_line({"type": "interrupted"})
+                return
+
+            ephemeral_history = _start_conversation(conversation, session, metadata)
+            start = len(session.history) - 1
+
+            events: asyncio.Queue[str | Message | AgentTurn | None] = asyncio.Queue()
+
+            async def run_turn():
+                async for event in agentic_chat_stream(
+                    llm=settings.llm, history=[*session.history]
+                ):
+                    events.put_nowait(event)
+
+            turn = asyncio.create_task(session.run_turn(run_turn()))
+            turn.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                with span("turn"):
+                    while (event := await events.get()) is not None:
+                        if isinstance(event, str):
+                            yield ndjson_line({"type": "segment", "content": event})
+                            continue
+                        if isinstance(event, AgentTurn):
+                            _log_answer(ephemeral_history[-1], event)
+                            continue
+
+                        session.append(event)
+                        ephemeral_history.append(event)
+                        result = _tool_result(event)
+                        if result is None:
+                            continue
+                        if result["archetype"] == "frontend-capability":
+                            yield ndjson_line(
+                                {"type": "frontend-capability", "capability": result}
+                            )
+                        if result["archetype"] == "background-job":
+                            yield ndjson_line(
+                                {"type": "background-job", "job_id": result["job_id"]}
+                            )
+                    await turn
+            except TurnInterrupted:
+                _rollback_turn(session, start)
+                _log_interruption(session, start)
+                yield ndjson_line({"type": "interrupted"})
+                return
+            except (asyncio.CancelledError, GeneratorExit):
+                # The client went away mid-turn
+                _rollback_turn(session, start)
+                _log_interruption(session, start)
+                raise
+            except BaseException:
+                _rollback_turn(session, start)
+                raise
+            finally:
+                turn.cancel()
+
+            session.trim(max_turns=settings.session_max_turns)
+            conversation_journal.commit()
+            with span("serialize"):
+                yield ndjson_line(
+                    {
+                        "type": "done",
+                        "messages": _serialize_messages(
+                            ephemeral_history, response=conversation.response
+                        ),
+                    }
+                )
+
+    return StreamingResponse(
+        frames(),
+        media_type="application/x-ndjson",
+        headers={"x-metadata-version": metadata.version},
     )
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str, request: Request, wait: float = 0):
+    if request.headers.get("x-secret") != settings.secret:
+        return Response(status_code=403)
+
+    job = reasoning_jobs.get(job_id)
+    if job is None:
+        return Response(status_code=404)
+    if wait > 0:
+        await reasoning_jobs.wait(job, timeout=min(wait, settings.job_max_wait))
+
+    return _json_response(job.dict(), request=request)
+
+
+@app.get("/api/jobs/{job_id}/stream")
+async def job_stream(job_id: str, request: Request):
+    if request.headers.get("x-secret") != settings.secret:
+        return Response(status_code=403)
+
+    job = reasoning_jobs.get(job_id)
+    if job is None:
+        return Response(status_code=404)
+
+    async def frames() -> AsyncIterator[bytes]:
+        sent = len(job.partial)
+        yield ndjson_line({"type": "partial", "content": job.partial})
+        async for update in reasoning_jobs.changes(job):
+            if len(update.partial) > sent:
+                yield ndjson_line({"type": "partial", "content": update.partial[sent:]})
+                sent = len(update.partial)
+        yield ndjson_line({"type": "done", "job": job.dict()})
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
+@app.get("/api/ready")
+async def ready():
+    return _json_response(warmup.dict(), status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
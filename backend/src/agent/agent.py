@@ -1,69 +1,302 @@
-import json
-from typing import Callable
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
 
-from ollama import Message
+from ollama import ChatResponse, Message, Tool
 
+from src.agent.cache import response_cache
 from src.agent.client import ollama_client
-from src.agent.tools.tools import ToolHandlers, ToolRepository, load_toolkits
+from src.agent.intents import Intent, match_intent
+from src.agent.models.conversation import current_session_id
+from src.agent.models.metadata import current_device_metadata
+from src.agent.scheduler import scheduler
+from src.agent.tools.binder import ToolArgumentError, ToolBinder
+from src.agent.tools.tools import ToolRegistry, load_toolkits, tool, tool_block
+from src.agent.utils.prompt import (
+    canonical_messages,
+    model_options,
+    record_prompt_eval,
+)
+from src.metrics import record_llm_call, span, tool_errors
+from src.serialization import dumps_text, loads
+from src.settings.settings import settings
+from src.utils import split_sentences
 
 
-def agentic_chat(
+@dataclass
+class AgentTurn:
+    messages: list[Message] = field(default_factory=lambda: [])
+    llm_calls: int = 0
+    tokens: int = 0
+
+
+tool_executor = ThreadPoolExecutor(
+    max_workers=settings.tool_workers, thread_name_prefix="tool"
+)
+
+
+async def _run_tool(binder: ToolBinder, kwargs: dict[str, Any]) -> object:
+    if binder.is_coroutine:
+        return await binder.function(**kwargs)
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        tool_executor, lambda: context.run(binder.function, **kwargs)
+    )
+
+
+async def _call_tool(
+    tool_call: Message.ToolCall,
     *,
-    llm: str,
-    history: list[Message],
-    toolkits_path: str = "./src/agent/tools/toolkits"
+    binder: ToolBinder,
+    tool_registry: ToolRegistry,
+) -> Message:
+    name = tool_call.function.name
+    try:
+        kwargs = binder.bind(tool_call.function.arguments)
+        with span("tool", tool=name):
+            result = await asyncio.wait_for(
+                _run_tool(binder, kwargs),
+                timeout=tool_registry.timeouts.get(name, settings.tool_timeout),
+            )
+    except ToolArgumentError as e:
+        tool_errors.inc(tool=name, reason="arguments")
+        result = tool.error(
+            name, error=f"Invalid arguments: {e}. Call the tool again with fixed ones."
+        )
+    except asyncio.TimeoutError:
+        tool_errors.inc(tool=name, reason="timeout")
+        result = tool.error(name, error="The tool took too long to respond.")
+    except Exception as e:
+        print(e)
+        tool_errors.inc(tool=name, reason="exception")
+        result = tool.error(name, error="The tool failed unexpectedly.")
+
+    return Message(role="tool", content=dumps_text(result), tool_calls=[tool_call])
+
+
+async def _call_tools(
+    tool_calls: list[Message.ToolCall], *, tool_registry: ToolRegistry
 ) -> list[Message]:
-    toolkits = load_toolkits(toolkits_path)
-    history_snapshot = [*history]
-
-    tool_repository: ToolRepository = {}
-    tool_handlers: ToolHandlers = {}
-    for tool in toolkits:
-        tool_repository = {**tool_repository, **tool.repository}
-        tool_handlers = {**tool_handlers, **tool.handlers}
-
-    chat = lambda tool_repository: ollama_client.chat(
-        model=llm,
-        messages=history_snapshot,
-        tools=None if tool_repository is None else [*tool_repository.values()],
+    calls = [
+        _call_tool(tool_call, binder=binder, tool_registry=tool_registry)
+        for tool_call in tool_calls
+        if (binder := tool_registry.dispatch.get(tool_call.function.name)) is not None
+    ]
+    return [*await asyncio.gather(*calls)]
+
+
+async def _stream_message(
+    chunks: AsyncIterator[ChatResponse], *, emit_segments: bool
+) -> AsyncIterator[str | ChatResponse]:
+    content = ""
+    pending = ""
+    tool_calls: list[Message.ToolCall] = []
+    last_chunk: ChatResponse | None = None
+    async for chunk in chunks:
+        last_chunk = chunk
+        content += chunk.message.content or ""
+        tool_calls.extend(chunk.message.tool_calls or [])
+        if not emit_segments:
+            continue
+
+        segments, pending = split_sentences(pending + (chunk.message.content or ""))
+        for segment in segments:
+            yield segment
+
+    if last_chunk is None:
+        return
+
+    if emit_segments and pending.strip():
+        yield pending.strip()
+
+    yield last_chunk.model_copy(
+        update={
+            "message": Message(
+                role="assistant", content=content, tool_calls=tool_calls or None
+            )
+        }
     )
-    message = chat(tool_repository).message
-    tool_calls = [
-        *filter(
-            lambda tool_call: tool_call.function.name in tool_repository,
-            message.tool_calls or [],
-        )
+
+
+def _select_tools(tool_registry: ToolRegistry, history: list[Message]) -> list[Tool]:
+    if not settings.tool_router_enabled:
+        return tool_registry.tools
+
+    user_messages = [
+        message.content or "" for message in history if message.role == "user"
     ]
+    query = " ".join(user_messages[-2:])
+    selected = tool_registry.router.select(
+        query,
+        top_k=settings.tool_router_top_k,
+        always=settings.tool_router_always,
+    )
+    pruned = [name for name in tool_registry.repository if name not in selected]
+    if len(pruned) > 0:
+        print(f"TOOLS PRUNED: {', '.join(pruned)}")
+    return tool_block(tool_registry, selected)
 
-    new_history = [message]
 
-    if len(tool_calls) == 0:
-        new_history = [*new_history, chat(None).message]
-        return new_history
+async def _run_intent(intent: Intent, tool_registry: ToolRegistry) -> AgentTurn | None:
+    binder = tool_registry.dispatch.get(intent.tool)
+    if binder is None:
+        return None
 
-    found_tool = False
-    for tool_call in tool_calls:
-        function_to_call: Callable | None = tool_repository.get(
-            tool_call.function.name
-        )  # pyright: ignore
-        if function_to_call is None:
-            continue
-        for [tool, args] in tool_handlers.items():
-            if function_to_call.__name__ == tool.__name__:
-                found_tool = True
-                result = tool(*args(tool_call))
-                tool_message = Message(
-                    role="tool", content=json.dumps(result), tool_calls=[tool_call]
-                )
-                new_history = [*new_history, tool_message]
-                break
-
-    if found_tool:
-        new_history = [
-            *new_history,
-            ollama_client.chat(
-                model=llm,
-                messages=[*history_snapshot, *new_history],
-            ).message,
+    tool_call = Message.ToolCall(
+        function=Message.ToolCall.Function(name=intent.tool, arguments=intent.arguments)
+    )
+    tool_message = await _call_tool(
+        tool_call, binder=binder, tool_registry=tool_registry
+    )
+    result = loads(tool_message.content or "null")
+    if isinstance(result, dict) and "error" in result:
+        return None
+
+    return AgentTurn(
+        messages=[
+            Message(role="assistant", content="", tool_calls=[tool_call]),
+            tool_message,
+            Message(role="assistant", content=intent.confirmation),
         ]
-    return new_history
+    )
+
+
+async def _replay_turn(
+    turn: AgentTurn, *, emit_segments: bool
+) -> AsyncIterator[str | Message | AgentTurn]:
+    for message in turn.messages:
+        if emit_segments and message.role == "assistant" and message.content:
+            segments, pending = split_sentences(message.content)
+            for segment in [*segments, pending.strip()]:
+                if segment:
+                    yield segment
+        yield message
+    yield turn
+
+
+async def _agent_loop(
+    *, llm: str, history: list[Message], toolkits_path: str, emit_segments: bool
+) -> AsyncIterator[str | Message | AgentTurn]:
+    with span("toolkit_load"):
+        tool_registry = load_toolkits(toolkits_path)
+    messages = canonical_messages(history)
+
+    intent = (
+        match_intent(messages[-1].content or "")
+        if settings.intent_fast_path and messages[-1].role == "user"
+        else None
+    )
+    intent_turn = None if intent is None else await _run_intent(intent, tool_registry)
+    if intent is not None and intent_turn is not None:
+        print(f"INTENT: {intent.tool} ({intent.confidence:.0%} confidence)")
+        async for event in _replay_turn(intent_turn, emit_segments=emit_segments):
+            yield event
+        return
+
+    session_id = current_session_id.get()
+    prompt = messages[-1].content if messages[-1].role == "user" else None
+    use_response_cache = settings.response_cache_enabled and bool(prompt)
+    cached_messages = (
+        response_cache.get(session_id, prompt or "", current_device_metadata.get())
+        if use_response_cache
+        else None
+    )
+    if cached_messages is not None:
+        print("RESPONSE CACHE: hit")
+        async for event in _replay_turn(
+            AgentTurn(messages=cached_messages), emit_segments=emit_segments
+        ):
+            yield event
+        return
+
+    with span("dispatch"):
+        tools = _select_tools(tool_registry, messages)
+    turn = AgentTurn()
+
+    while True:
+        is_last_step = (
+            turn.llm_calls + 1 >= settings.agent_max_steps
+            or turn.tokens >= settings.agent_max_tokens
+        )
+
+        response: ChatResponse | None = None
+        async with scheduler.slot(llm):
+            with span("llm", model=llm):
+                async for event in _stream_message(
+                    await ollama_client.chat(
+                        model=llm,
+                        messages=messages,
+                        tools=None if is_last_step or len(tools) == 0 else tools,
+                        stream=True,
+                        **model_options(llm),
+                    ),
+                    emit_segments=emit_segments,
+                ):
+                    if isinstance(event, ChatResponse):
+                        response = event
+                    else:
+                        yield event
+        if response is None:
+            break
+
+        record_llm_call(llm, response)
+        record_prompt_eval(llm, messages, response)
+        turn.llm_calls += 1
+        turn.tokens += (response.prompt_eval_count or 0) + (response.eval_count or 0)
+        messages.append(response.message)
+        turn.messages.append(response.message)
+        yield response.message
+
+        tool_calls = [
+            *filter(
+                lambda tool_call: tool_call.function.name in tool_registry.dispatch,
+                response.message.tool_calls or [],
+            )
+        ]
+        if is_last_step or len(tool_calls) == 0:
+            break
+
+        tool_messages = await _call_tools(tool_calls, tool_registry=tool_registry)
+        if len(tool_messages) == 0:
+            break
+        messages.extend(tool_messages)
+        turn.messages.extend(tool_messages)
+        for tool_message in tool_messages:
+            yield tool_message
+
+    if use_response_cache:
+        response_cache.put(
+            session_id,
+            prompt or "",
+            current_device_metadata.get(),
+            messages=turn.messages,
+            tool_registry=tool_registry,
+        )
+    yield turn
+
+
+async def agentic_chat(
+    *,
+    llm: str,
+    history: list[Message],
+    toolkits_path: str = settings.toolkits_path,
+) -> AgentTurn:
+    async for event in _agent_loop(
+        llm=llm, history=history, toolkits_path=toolkits_path, emit_segments=False
+    ):
+        if isinstance(event, AgentTurn):
+            return event
+    return AgentTurn()
+
+
+def agentic_chat_stream(
+    *,
+    llm: str,
+    history: list[Message],
+    toolkits_path: str = settings.toolkits_path,
+) -> AsyncIterator[str | Message | AgentTurn]:
+    return _agent_loop(
+        llm=llm, history=history, toolkits_path=toolkits_path, emit_segments=True
+    )
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from ollama import Message
+
+from src.agent.models.metadata import metadata_version
+from src.agent.tools.tools import ToolRegistry
+from src.metrics import (
+    response_cache_hits,
+    response_cache_misses,
+    response_cache_skips,
+)
+from src.serialization import JSONDecodeError, loads
+from src.settings.settings import settings
+from src.utils import TTLCache, normalize_utterance
+
+
+@dataclass
+class _CachedResponse:
+    messages: list[Message]
+    reads: list[str]
+    views: dict[str, Callable[[Any], Any]]
+    fingerprint: str
+
+
+def _fingerprint(
+    metadata: dict[str, Any],
+    reads: list[str],
+    views: dict[str, Callable[[Any], Any]],
+) -> str:
+    return metadata_version(
+        {
+            section: views.get(section, _identity)(metadata.get(section))
+            for section in reads
+        }
+    )
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _has_error(message: Message) -> bool:
+    try:
+        result = loads(message.content or "null")
+    except JSONDecodeError:
+        return False
+    return isinstance(result, dict) and "error" in result
+
+
+class ResponseCache:
+    def __init__(self, *, ttl: float, max_size: int):
+        self.ttl = ttl
+        self._responses = TTLCache(ttl=ttl, max_size=max_size)
+
+    def _key(self, session_id: str, prompt: str) -> tuple[str, str] | None:
+        tokens = normalize_utterance(prompt, assistant_name=settings.assistant_name)
+        if len(tokens) == 0:
+            return None
+        return session_id, " ".join(tokens)
+
+    def get(
+        self, session_id: str, prompt: str, metadata: dict[str, Any]
+    ) -> list[Message] | None:
+        key = self._key(session_id, prompt)
+        cached: _CachedResponse | None = (
+            None if key is None else self._responses.get(key)
+        )
+        if cached is None or cached.fingerprint != _fingerprint(
+            metadata, cached.reads, cached.views
+        ):
+            response_cache_misses.inc()
+            return None
+        response_cache_hits.inc()
+        return cached.messages
+
+    def put(
+        self,
+        session_id: str,
+        prompt: str,
+        metadata: dict[str, Any],
+        *,
+        messages: list[Message],
+        tool_registry: ToolRegistry,
+    ):
+        key = self._key(session_id, prompt)
+        tool_names = {
+            tool_call.function.name
+            for message in messages
+            for tool_call in message.tool_calls or []
+        }
+        policies = [tool_registry.cache_policies.get(name) for name in tool_names]
+        # Plain answers depend on the conversation so far, which isn't part of
+        # the key, so only turns fully answered by cacheable tools are stored.
+        if (
+            key is None
+            or len(messages) == 0
+            or len(policies) == 0
+            or any(policy is None or not policy.cacheable for policy in policies)
+            or any(
+                message.role == "tool" and _has_error(message) for message in messages
+            )
+        ):
+            response_cache_skips.inc()
+            return
+
+        reads = sorted(
+            {section for policy in policies if policy for section in policy.reads}
+        )
+        views = {
+            section: view
+            for policy in policies
+            if policy
+            for section, view in policy.views.items()
+        }
+        self._responses.set(
+            key,
+            _CachedResponse(
+                messages=messages,
+                reads=reads,
+                views=views,
+                fingerprint=_fingerprint(metadata, reads, views),
+            ),
+            ttl=min([self.ttl, *(policy.ttl for policy in policies if policy)]),
+        )
+
+    def forget(self, session_id: str):
+        self._responses.delete_where(lambda key: key[0] == session_id)
+
+
+response_cache = ResponseCache(
+    ttl=settings.response_cache_ttl, max_size=settings.response_cache_size
+)
@@ -1,3 +1,5 @@
 import ollama
 
-ollama_client = ollama.Client("http://localhost:7869")
+from src.settings.settings import settings
+
+ollama_client = ollama.AsyncClient(settings.ollama_host)
@@ -0,0 +1,156 @@
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from src.agent.models.metadata import current_device_metadata
+from src.agent.tools.utils import application_key
+from src.settings.settings import settings
+from src.utils import find_similar, levenshtein_distance, normalize_utterance
+
+_CONJUNCTIONS = {"and", "then", "but", "also"}
+
+
+@dataclass
+class Intent:
+    tool: str
+    arguments: dict[str, str]
+    confidence: float
+    confirmation: str
+
+
+SlotResolver = Callable[[dict[str, str]], tuple[dict[str, str], float]]
+
+
+@dataclass
+class _IntentPattern:
+    tool: str
+    pattern: re.Pattern
+    confirmation: str
+    resolve: SlotResolver | None = None
+
+
+def _resolve_application(arguments: dict[str, str]) -> tuple[dict[str, str], float]:
+    installed_apps: list[str] = current_device_metadata.get().get("installedApps", [])
+    app, similarity = find_similar(
+        installed_apps,
+        arguments["application_name"].lower(),
+        application_key,
+    )
+    if app is None or similarity is None:
+        return arguments, 0
+    return {"application_name": application_key(app)}, similarity
+
+
+_POLITE_PREFIX = r"^(?:(?:please|can you|could you|would you|will you|just) )*"
+_POLITE_SUFFIX = r"(?: (?:please|now|for me))*$"
+
+_INTENT_PATTERNS = [
+    _IntentPattern(
+        tool="search_on_youtube",
+        pattern=re.compile(
+            _POLITE_PREFIX
+            + r"(?:search|look up|find)(?: on)? youtube for (?P<search_query>.+?)"
+            + _POLITE_SUFFIX
+        ),
+        confirmation="Searching YouTube for {search_query}.",
+    ),
+    _IntentPattern(
+        tool="search_on_youtube",
+        pattern=re.compile(
+            _POLITE_PREFIX
+            + r"(?:search|look up|find)(?: for)? (?P<search_query>.+?) on youtube"
+            + _POLITE_SUFFIX
+        ),
+        confirmation="Searching YouTube for {search_query}.",
+    ),
+    _IntentPattern(
+        tool="play_some_jazz",
+        pattern=re.compile(
+            _POLITE_PREFIX
+            + r"(?:play|put on)(?: me)?(?: some)? jazz(?: music)?"
+            + _POLITE_SUFFIX
+        ),
+        confirmation="Playing some jazz.",
+    ),
+    _IntentPattern(
+        tool="open_application",
+        pattern=re.compile(
+            _POLITE_PREFIX
+            + r"(?:open|launch)(?: up)?(?: the)? (?P<application_name>.+?)"
+            + r"(?: app| application)?"
+            + _POLITE_SUFFIX
+        ),
+        confirmation="Opening {application_name}.",
+        resolve=_resolve_application,
+    ),
+]
+
+_VOCABULARY = {
+    word
+    for intent_pattern in _INTENT_PATTERNS
+    for word in re.findall(
+        r"[a-z]{3,}", re.sub(r"\(\?P<\w+>", "", intent_pattern.pattern.pattern)
+    )
+}
+
+
+def _correct(token: str) -> tuple[str, float]:
+    if token in _VOCABULARY or len(token) < 3:
+        return token, 1
+    word, similarity = max(
+        ((word, levenshtein_distance(token, word)) for word in _VOCABULARY),
+        key=lambda x: x[1],
+    )
+    if similarity < settings.intent_min_confidence:
+        return token, 1
+    return word, similarity
+
+
+def match_intent(prompt: str) -> Intent | None:
+    tokens = normalize_utterance(prompt, assistant_name=settings.assistant_name)
+    if len(tokens) == 0:
+        return None
+
+    corrections = [_correct(token) for token in tokens]
+    text = " ".join(word for word, _ in corrections)
+
+    for intent_pattern in _INTENT_PATTERNS:
+        match = intent_pattern.pattern.match(text)
+        if match is None:
+            continue
+
+        arguments: dict[str, str] = {}
+        slot_positions: set[int] = set()
+        for slot, value in match.groupdict().items():
+            start = text[: match.start(slot)].count(" ")
+            end = start + value.count(" ") + 1
+            slot_tokens = tokens[start:end]
+            if _CONJUNCTIONS.intersection(slot_tokens):
+                return None
+            arguments[slot] = " ".join(slot_tokens)
+            slot_positions.update(range(start, end))
+
+        confidence = min(
+            [
+                similarity
+                for position, (_, similarity) in enumerate(corrections)
+                if position not in slot_positions
+            ],
+            default=1,
+        )
+        if confidence < settings.intent_min_confidence:
+            return None
+
+        if intent_pattern.resolve is not None:
+            arguments, similarity = intent_pattern.resolve(arguments)
+            if similarity < settings.intent_min_slot_similarity:
+                return None
+            confidence = min(confidence, similarity)
+
+        return Intent(
+            tool=intent_pattern.tool,
+            arguments=arguments,
+            confidence=confidence,
+            confirmation=intent_pattern.confirmation.format(**arguments),
+        )
+    return None
@@ -0,0 +1,168 @@
+import asyncio
+import re
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Literal
+
+from ollama import ChatResponse, Message
+
+from src.agent.client import ollama_client
+from src.agent.scheduler import Priority, scheduler
+from src.agent.utils.prompt import model_options
+from src.metrics import record_llm_call, span
+from src.settings.settings import settings
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+_THINKING = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+
+
+@dataclass
+class Job:
+    id: str
+    session_id: str
+    task: str
+    model: str
+    status: JobStatus = "queued"
+    partial: str = ""
+    result: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    recorded: bool = False
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ["done", "failed"]
+
+    def dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "task": self.task,
+            "partial": self.partial,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, *, workers: int, max_pending: int, ttl: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue: asyncio.Queue[Job] | None = None
+        self._workers: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [
+            loop.create_task(self._work(self._queue)) for _ in range(self.workers)
+        ]
+
+    def _notify(self, job: Job):
+        changed, job.changed = job.changed, asyncio.Event()
+        changed.set()
+
+    def _evict(self):
+        now = time.time()
+        for job_id, job in [*self._jobs.items()]:
+            if job.finished_at is not None and now - job.finished_at > self.ttl:
+                del self._jobs[job_id]
+
+    def submit(self, session_id: str, task: str, *, model: str) -> Job | None:
+        self._start()
+        self._evict()
+        job = Job(
+            id=uuid.uuid4().hex[:12], session_id=session_id, task=task, model=model
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return None
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def changes(self, job: Job) -> AsyncIterator[Job]:
+        while not job.finished:
+            await job.changed.wait()
+            yield job
+
+    async def wait(self, job: Job, *, timeout: float) -> Job:
+        deadline = time.monotonic() + timeout
+        while not job.finished and (remaining := deadline - time.monotonic()) > 0:
+            try:
+                await asyncio.wait_for(job.changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return job
+
+    def collect_finished(self, session_id: str) -> list[Job]:
+        finished = [
+            job
+            for job in self._jobs.values()
+            if job.session_id == session_id and job.finished and not job.recorded
+        ]
+        for job in finished:
+            job.recorded = True
+        return finished
+
+    async def _work(self, queue: asyncio.Queue[Job]):
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                print(e)
+                job.status, job.error = "failed", "Reasoning model request failed."
+            finally:
+                job.finished_at = time.time()
+                self._notify(job)
+                queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = "running"
+        self._notify(job)
+
+        last_chunk: ChatResponse | None = None
+        async with scheduler.slot(job.model, Priority.REASONING):
+            with span("llm", model=job.model):
+                async for chunk in await ollama_client.chat(
+                    model=job.model,
+                    messages=[Message(role="user", content=job.task)],
+                    stream=True,
+                    **model_options(job.model),
+                ):
+                    last_chunk = chunk
+                    job.partial += chunk.message.content or ""
+                    self._notify(job)
+        if last_chunk is not None:
+            record_llm_call(job.model, last_chunk)
+
+        result = _THINKING.sub("", job.partial).strip()
+        if not result:
+            job.status, job.error = (
+                "failed",
+                "Reasoning model didn't respond with anything.",
+            )
+            return
+        job.status, job.result = "done", result
+
+
+reasoning_jobs = JobQueue(
+    workers=settings.reasoning_workers,
+    max_pending=settings.reasoning_max_pending_jobs,
+    ttl=settings.reasoning_job_ttl,
+)
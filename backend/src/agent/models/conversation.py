@@ -1,14 +1,182 @@
-from typing import Any
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Literal, TypeVar
 
 from ollama import Message
 from pydantic import BaseModel
 
+from src.agent.cache import response_cache
+from src.agent.models.journal import (
+    ConversationJournal,
+    JournaledSession,
+    conversation_journal,
+)
 from src.agent.utils.prompt import SYSTEM_PROMPT
+from src.settings.settings import settings
+
+T = TypeVar("T")
+ResponseMode = Literal["history", "final"]
+
+
+class TurnInterrupted(Exception):
+    pass
 
 
 class Conversation(BaseModel):
     prompt: str
-    metadata: dict[str, Any]
+    metadata: dict[str, Any] = {}
+    metadata_version: str | None = None
+    session_id: str = "default"
+    priority: Literal["interactive", "background"] = "interactive"
+    response: ResponseMode = "history"
+
+
+@dataclass
+class Session:
+    id: str = ""
+    history: list[Message] = field(default_factory=lambda: [SYSTEM_PROMPT])
+    journal: ConversationJournal | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    generation: int = 0
+    turn: asyncio.Future | None = None
+    pins: int = 0
+
+    def _record(self, op: str, **fields: Any):
+        # Journal positions skip the system prompt, which is never persisted.
+        if self.journal is not None:
+            self.journal.record(self.id, op, **fields)
+
+    def append(self, message: Message):
+        self.history.append(message)
+        self._record("append", message=message.model_dump(exclude_none=True))
+
+    def extend(self, messages: list[Message]):
+        for message in messages:
+            self.append(message)
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        # Pinned while waiting for the lock too, so the store can't evict the
+        # session between a turn queueing up and it starting.
+        self.pins += 1
+        try:
+            async with self.lock:
+                yield
+        finally:
+            self.pins -= 1
+
+    def interrupt(self) -> int:
+        self.generation += 1
+        if self.turn is not None and not self.turn.done():
+            self.turn.cancel()
+        return self.generation
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self.generation
+
+    async def run_turn(self, awaitable: Awaitable[T]) -> T:
+        turn = asyncio.ensure_future(awaitable)
+        self.turn = turn
+        try:
+            await asyncio.wait({turn})
+        except asyncio.CancelledError:
+            turn.cancel()
+            raise
+        finally:
+            if self.turn is turn:
+                self.turn = None
+        if turn.cancelled():
+            raise TurnInterrupted()
+        return turn.result()
+
+    def rollback(self, start: int):
+        turn = self.history[start:]
+        last_tool_result = max(
+            (index for index, message in enumerate(turn) if message.role == "tool"),
+            default=-1,
+        )
+        self.history[start:] = turn[: last_tool_result + 1]
+        self._record("delete", start=start + last_tool_result)
+
+    def clear(self):
+        self.history[:] = [SYSTEM_PROMPT]
+        self._record("open")
+
+    def trim(self, *, max_turns: int):
+        turn_starts = [
+            index
+            for index, message in enumerate(self.history)
+            if message.role == "user"
+        ]
+        if len(turn_starts) <= max_turns:
+            return
+        self.history[1:] = self.history[turn_starts[-max_turns] :]
+        self._record("delete", start=0, stop=turn_starts[-max_turns] - 1)
+
+
+class SessionStore:
+    def __init__(
+        self,
+        *,
+        max_sessions: int,
+        idle_ttl: float,
+        journal: ConversationJournal | None = None,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.journal = journal
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def get(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(id=session_id, journal=self.journal)
+            session._record("open")
+            self._sessions[session_id] = session
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def restore(self, journaled: dict[str, JournaledSession]):
+        now, monotonic_now = time.time(), time.monotonic()
+        for session_id, state in journaled.items():
+            self._sessions[session_id] = Session(
+                id=session_id,
+                history=[
+                    SYSTEM_PROMPT,
+                    *[Message.model_validate(message) for message in state.messages],
+                ],
+                journal=self.journal,
+                last_used=monotonic_now - (now - state.last_used),
+            )
+            self._sessions.move_to_end(session_id)
+        self._evict()
+
+    def clear(self, session_id: str):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.clear()
+        response_cache.forget(session_id)
+
+    def _evict(self):
+        now = time.monotonic()
+        for session_id, session in [*self._sessions.items()]:
+            if session.pins > 0:
+                continue
+            is_idle = now - session.last_used > self.idle_ttl
+            if is_idle or len(self._sessions) > self.max_sessions:
+                del self._sessions[session_id]
 
 
-history: list[Message] = [SYSTEM_PROMPT]
+sessions = SessionStore(
+    max_sessions=settings.max_sessions,
+    idle_ttl=settings.session_idle_ttl,
+    journal=conversation_journal if settings.journal_enabled else None,
+)
+current_session_id: ContextVar[str] = ContextVar("current_session_id", default="")
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.metrics import span
+from src.serialization import JSONDecodeError, dumps, loads, ndjson_line
+from src.settings.settings import settings
+
+_SEGMENT = re.compile(r"^segment-(\d+)\.ndjson$")
+_SNAPSHOT = re.compile(r"^snapshot-(\d+)\.json$")
+
+
+@dataclass
+class JournaledSession:
+    messages: list[dict[str, Any]] = field(default_factory=lambda: [])
+    last_used: float = 0
+
+
+def _apply(sessions: dict[str, JournaledSession], record: dict[str, Any]):
+    session_id, op = record["session"], record["op"]
+    if op == "open":
+        sessions[session_id] = JournaledSession()
+    session = sessions.setdefault(session_id, JournaledSession())
+    session.last_used = record["at"]
+    if op == "append":
+        session.messages.append(record["message"])
+    elif op == "delete":
+        del session.messages[record["start"] : record.get("stop")]
+
+
+class ConversationJournal:
+    def __init__(self, directory: str, *, segment_bytes: int, idle_ttl: float):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._pending: list[bytes] = []
+        self._fd: int | None = None
+        self._segment = 0
+        self._dirty = False
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _files(self, pattern: re.Pattern) -> list[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(match.group(1))
+            for name in os.listdir(self.directory)
+            if (match := pattern.match(name)) is not None
+        )
+
+    def _open(self) -> int:
+        if self._fd is None:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._segment == 0:
+                # Never append to a previous run's segment, it may end in a
+                # torn record.
+                self._segment = (
+                    max(self._files(_SEGMENT) + self._files(_SNAPSHOT), default=0) + 1
+                )
+            self._fd = os.open(
+                self._path(f"segment-{self._segment:08d}.ndjson"),
+                os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                0o644,
+            )
+        return self._fd
+
+    def _seal(self):
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+            self._segment += 1
+            self._dirty = False
+
+    def record(self, session_id: str, op: str, **fields: Any):
+        line = ndjson_line(
+            {"session": session_id, "op": op, "at": time.time(), **fields}
+        )
+        with self._lock:
+            self._pending.append(line)
+
+    def commit(self):
+        with self._lock:
+            if len(self._pending) == 0:
+                return
+            fd = self._open()
+            os.write(fd, b"".join(self._pending))
+            self._pending.clear()
+            self._dirty = True
+            if os.fstat(fd).st_size >= self.segment_bytes:
+                self._seal()
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and self._fd is not None:
+                os.fsync(self._fd)
+                self._dirty = False
+
+    def _read_segment(self, segment: int, sessions: dict[str, JournaledSession]):
+        with open(self._path(f"segment-{segment:08d}.ndjson"), "rb") as file:
+            for line in file:
+                try:
+                    record = loads(line)
+                except JSONDecodeError:
+                    # A crash mid-write leaves at most one torn record, at the end.
+                    break
+                _apply(sessions, record)
+
+    def _load(self, segments: list[int]) -> dict[str, JournaledSession]:
+        sessions: dict[str, JournaledSession] = {}
+        snapshots = self._files(_SNAPSHOT)
+        if len(snapshots) > 0:
+            with open(self._path(f"snapshot-{snapshots[-1]:08d}.json"), "rb") as file:
+                sessions = {
+                    session_id: JournaledSession(**session)
+                    for session_id, session in loads(file.read())["sessions"].items()
+                }
+        for segment in segments:
+            if len(snapshots) == 0 or segment > snapshots[-1]:
+                self._read_segment(segment, sessions)
+
+        oldest = time.time() - self.idle_ttl
+        return {
+            session_id: session
+            for session_id, session in sorted(
+                sessions.items(), key=lambda item: item[1].last_used
+            )
+            if session.last_used >= oldest
+        }
+
+    def replay(self) -> dict[str, JournaledSession]:
+        with self._compaction_lock:
+            return self._load(self._files(_SEGMENT))
+
+    def _sealed(self) -> list[int]:
+        with self._lock:
+            return [
+                segment
+                for segment in self._files(_SEGMENT)
+                if self._segment == 0 or segment < self._segment
+            ]
+
+    @property
+    def compactable(self) -> bool:
+        return len(self._sealed()) > 0
+
+    def compact(self):
+        with self._compaction_lock, span("journal_compact"):
+            sealed = self._sealed()
+            if len(sealed) == 0:
+                return
+            sessions = self._load(sealed)
+            snapshot = self._path(f"snapshot-{sealed[-1]:08d}.json")
+            with open(snapshot + ".tmp", "wb") as file:
+                file.write(
+                    dumps(
+                        {
+                            "segment": sealed[-1],
+                            "sessions": {
+                                session_id: {
+                                    "messages": session.messages,
+                                    "last_used": session.last_used,
+                                }
+                                for session_id, session in sessions.items()
+                            },
+                        },
+                    )
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(snapshot + ".tmp", snapshot)
+            directory = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+            for segment in sealed:
+                os.remove(self._path(f"segment-{segment:08d}.ndjson"))
+            for older in self._files(_SNAPSHOT):
+                if older < sealed[-1]:
+                    os.remove(self._path(f"snapshot-{older:08d}.json"))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.journal_fsync_interval)
+            try:
+                await asyncio.to_thread(self.sync)
+                if self.compactable:
+                    await asyncio.to_thread(self.compact)
+            except OSError as e:
+                print(f"JOURNAL: {e}")
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._seal()
+
+
+conversation_journal = ConversationJournal(
+    settings.journal_path,
+    segment_bytes=settings.journal_segment_bytes,
+    idle_ttl=settings.session_idle_ttl,
+)
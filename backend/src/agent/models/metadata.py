@@ -0,0 +1,76 @@
+import hashlib
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.serialization import dumps
+from src.settings.settings import settings
+
+DELTA_UPSERT = "$upsert"
+DELTA_REMOVE = "$remove"
+
+
+def _is_delta(value: Any) -> bool:
+    return isinstance(value, dict) and (DELTA_UPSERT in value or DELTA_REMOVE in value)
+
+
+def _apply_delta(section: Any, delta: dict[str, Any]) -> dict[str, Any]:
+    updated = {**section} if isinstance(section, dict) else {}
+    for key in delta.get(DELTA_REMOVE, []):
+        updated.pop(key, None)
+    updated.update(delta.get(DELTA_UPSERT, {}))
+    return updated
+
+
+def metadata_version(sections: dict[str, Any]) -> str:
+    return hashlib.sha1(dumps(sections, sort_keys=True)).hexdigest()
+
+
+@dataclass
+class DeviceMetadata:
+    sections: dict[str, Any] = field(default_factory=lambda: {})
+    version: str = field(default_factory=lambda: metadata_version({}))
+
+
+class MetadataStore:
+    def __init__(self, *, max_devices: int):
+        self.max_devices = max_devices
+        self._devices: OrderedDict[str, DeviceMetadata] = OrderedDict()
+
+    def apply(
+        self, device_id: str, *, base_version: str | None, sections: dict[str, Any]
+    ) -> DeviceMetadata | None:
+        current = self._devices.get(device_id)
+        if base_version is None:
+            current = DeviceMetadata()
+            sections = {
+                name: _apply_delta({}, value) if _is_delta(value) else value
+                for name, value in sections.items()
+            }
+        elif current is None or current.version != base_version:
+            return None
+
+        if len(sections) > 0 or device_id not in self._devices:
+            updated = {**current.sections}
+            for name, value in sections.items():
+                updated[name] = (
+                    _apply_delta(updated.get(name), value)
+                    if _is_delta(value)
+                    else value
+                )
+            current = DeviceMetadata(
+                sections=updated, version=metadata_version(updated)
+            )
+
+        self._devices[device_id] = current
+        self._devices.move_to_end(device_id)
+        if len(self._devices) > self.max_devices:
+            self._devices.popitem(last=False)
+        return current
+
+
+device_metadata = MetadataStore(max_devices=settings.max_sessions)
+current_device_metadata: ContextVar[dict[str, Any]] = ContextVar(
+    "current_device_metadata", default={}
+)
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import threading
+import time
+
+from src.settings.settings import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    item TEXT PRIMARY KEY COLLATE NOCASE,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todos_by_completion ON todos (completed, created_at);
+"""
+
+
+class ToDoStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def items(self, *, completed: bool) -> list[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT item FROM todos WHERE completed = ? ORDER BY created_at",
+                (int(completed),),
+            )
+            return [item for item, in rows]
+
+    def add(self, items: list[str]) -> int:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            return connection.executemany(
+                "INSERT INTO todos (item, completed, created_at) VALUES (?, 0, ?) "
+                "ON CONFLICT (item) DO UPDATE SET completed = 0",
+                [(item, now + index * 1e-6) for index, item in enumerate(items)],
+            ).rowcount
+
+    def remove(self, items: list[str]) -> int:
+        with self._lock, self._connect() as connection:
+            return connection.executemany(
+                "DELETE FROM todos WHERE item = ?", [(item,) for item in items]
+            ).rowcount
+
+    def mark(self, items: list[str], *, completed: bool) -> int:
+        with self._lock, self._connect() as connection:
+            return connection.executemany(
+                "UPDATE todos SET completed = ? WHERE item = ?",
+                [(int(completed), item) for item in items],
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+todo_store = ToDoStore(settings.todo_db_path)
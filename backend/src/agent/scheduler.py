@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator
+
+from src.metrics import metrics
+from src.settings.settings import settings
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    REASONING = 2
+
+
+class SchedulerFull(Exception):
+    def __init__(self, model: str, *, retry_after: int):
+        super().__init__(f"Too many requests queued for {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+queue_wait_seconds = metrics.histogram(
+    "lola_scheduler_queue_wait_seconds",
+    "Time an LLM call waited for a free slot on its model.",
+)
+queue_rejections = metrics.counter(
+    "lola_scheduler_rejections_total", "Requests rejected because the queue was full."
+)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    future: asyncio.Future = field(compare=False)
+
+
+class ModelQueue:
+    def __init__(self, *, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.hold_seconds = 1.0
+        self._waiters: list[_Waiter] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def full(self) -> bool:
+        return self.active >= self.concurrency and self.queued >= self.max_queue
+
+    def retry_after(self) -> int:
+        return max(
+            1, math.ceil(self.hold_seconds * (self.queued + 1) / self.concurrency)
+        )
+
+    async def acquire(self, priority: Priority):
+        if self.active < self.concurrency and self.queued == 0:
+            self.active += 1
+            return
+
+        waiter = _Waiter(
+            priority, next(self._sequence), asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self):
+        while self.queued > 0:
+            waiter = heapq.heappop(self._waiters)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self.active -= 1
+
+    def record_hold(self, seconds: float):
+        self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * seconds
+
+
+class Scheduler:
+    def __init__(
+        self, *, concurrency: dict[str, int], default_concurrency: int, max_queue: int
+    ):
+        self.concurrency = concurrency
+        self.default_concurrency = default_concurrency
+        self.max_queue = max_queue
+        self._queues: dict[str, ModelQueue] = {}
+        self._pending: dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._outranked_waiters: list[asyncio.Future] = []
+
+    def queue(self, model: str) -> ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = ModelQueue(
+                concurrency=self.concurrency.get(model, self.default_concurrency),
+                max_queue=self.max_queue,
+            )
+        return queue
+
+    def outranked(self, priority: Priority) -> bool:
+        return any(
+            count > 0 for other, count in self._pending.items() if other < priority
+        )
+
+    async def _yield_to_higher_priorities(self, priority: Priority):
+        # Models share one inference box, so lower priorities wait for every
+        # queued or running higher-priority call, whatever its model
+        while self.outranked(priority):
+            waiter = asyncio.get_running_loop().create_future()
+            self._outranked_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._outranked_waiters:
+                    self._outranked_waiters.remove(waiter)
+
+    def _track(self, priority: Priority, delta: int):
+        self._pending[priority] += delta
+        if delta < 0:
+            waiters, self._outranked_waiters = self._outranked_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def admit(self, model: str):
+        queue = self.queue(model)
+        if queue.full:
+            queue_rejections.inc(model=model)
+            raise SchedulerFull(model, retry_after=queue.retry_after())
+
+    @asynccontextmanager
+    async def slot(
+        self, model: str, priority: Priority | None = None
+    ) -> AsyncIterator[None]:
+        priority = current_priority.get() if priority is None else priority
+        queue = self.queue(model)
+        started = time.perf_counter()
+        self._track(priority, 1)
+        try:
+            await self._yield_to_higher_priorities(priority)
+            await queue.acquire(priority)
+            acquired = time.perf_counter()
+            queue_wait_seconds.observe(
+                acquired - started, model=model, priority=priority.name.lower()
+            )
+            try:
+                yield
+            finally:
+                queue.record_hold(time.perf_counter() - acquired)
+                queue.release()
+        finally:
+            self._track(priority, -1)
+
+
+scheduler = Scheduler(
+    concurrency=settings.scheduler_concurrency,
+    default_concurrency=settings.scheduler_default_concurrency,
+    max_queue=settings.scheduler_max_queue,
+)
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority", default=Priority.INTERACTIVE
+)
@@ -0,0 +1,186 @@
+import inspect
+import json
+import types
+import typing
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Mapping
+
+_TRUE = {"true", "yes", "y", "on", "1"}
+_FALSE = {"false", "no", "n", "off", "0"}
+
+
+class ToolArgumentError(Exception):
+    pass
+
+
+@dataclass
+class _Parameter:
+    name: str
+    annotation: Any
+    required: bool
+    default: Any
+
+
+@dataclass
+class ToolBinder:
+    name: str
+    function: Callable
+    parameters: list[_Parameter]
+    is_coroutine: bool
+
+    def bind(self, arguments: Mapping[str, Any] | None) -> dict[str, Any]:
+        arguments = arguments or {}
+        bound: dict[str, Any] = {}
+        for parameter in self.parameters:
+            value = arguments.get(parameter.name)
+            if value is None:
+                if parameter.required:
+                    raise ToolArgumentError(f"missing argument '{parameter.name}'")
+                bound[parameter.name] = parameter.default
+                continue
+            try:
+                bound[parameter.name] = coerce(value, parameter.annotation)
+            except (TypeError, ValueError):
+                raise ToolArgumentError(
+                    f"argument '{parameter.name}' should be {_type_name(parameter.annotation)}, got {json.dumps(value, default=str)}"
+                ) from None
+        return bound
+
+
+def _type_name(annotation: Any) -> str:
+    origin = typing.get_origin(annotation)
+    if origin is Literal:
+        return " or ".join(json.dumps(option) for option in typing.get_args(annotation))
+    if origin in [typing.Union, types.UnionType]:
+        return " or ".join(_type_name(arg) for arg in typing.get_args(annotation))
+    if origin is not None:
+        return getattr(origin, "__name__", str(annotation))
+    return getattr(annotation, "__name__", str(annotation))
+
+
+def _coerce_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in [0, 1]:
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    raise ValueError(value)
+
+
+def _coerce_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError(value)
+
+
+def _coerce_float(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return float(value.strip())
+    raise ValueError(value)
+
+
+def _coerce_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(value)
+
+
+def _decode_json(value: Any, kind: type) -> Any:
+    if isinstance(value, str):
+        try:
+            decoded = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+        if isinstance(decoded, kind):
+            return decoded
+    return value
+
+
+_SCALARS: dict[type, Callable[[Any], Any]] = {
+    bool: _coerce_bool,
+    int: _coerce_int,
+    float: _coerce_float,
+    str: _coerce_str,
+}
+
+
+def coerce(value: Any, annotation: Any) -> Any:
+    if annotation in [inspect.Parameter.empty, Any, object]:
+        return value
+    if annotation in _SCALARS:
+        return _SCALARS[annotation](value)
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is Literal:
+        for option in args:
+            if value == option or (isinstance(value, str) and str(option) == value):
+                return option
+        raise ValueError(value)
+    if origin in [typing.Union, types.UnionType]:
+        exact = [arg for arg in args if arg in _SCALARS and type(value) is arg]
+        for arg in [*exact, *args]:
+            try:
+                return coerce(value, arg)
+            except (TypeError, ValueError):
+                continue
+        raise ValueError(value)
+    if origin in [list, tuple, set] or annotation in [list, tuple, set]:
+        container = origin or annotation
+        value = _decode_json(value, list)
+        items = value if isinstance(value, list) else [value]
+        item_type = args[0] if len(args) > 0 else Any
+        return container(coerce(item, item_type) for item in items)
+    if origin is dict or annotation is dict:
+        value = _decode_json(value, dict)
+        if not isinstance(value, dict):
+            raise ValueError(value)
+        return value
+    if annotation is type(None):
+        raise ValueError(value)
+    if isinstance(annotation, type) and not isinstance(value, annotation):
+        raise ValueError(value)
+    return value
+
+
+def create_tool_binder(function: Callable) -> ToolBinder:
+    unwrapped = inspect.unwrap(function)
+    try:
+        hints = typing.get_type_hints(unwrapped)
+    except Exception:
+        hints = {}
+
+    parameters = [
+        _Parameter(
+            name=name,
+            annotation=hints.get(name, parameter.annotation),
+            required=parameter.default is inspect.Parameter.empty,
+            default=(
+                None
+                if parameter.default is inspect.Parameter.empty
+                else parameter.default
+            ),
+        )
+        for name, parameter in inspect.signature(function).parameters.items()
+        if parameter.kind
+        not in [inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD]
+    ]
+    return ToolBinder(
+        name=function.__name__,
+        function=function,
+        parameters=parameters,
+        is_coroutine=inspect.iscoroutinefunction(unwrapped),
+    )
@@ -0,0 +1,14 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.settings.settings import settings
+
+http_session = requests.Session()
+for prefix in ["https://", "http://"]:
+    http_session.mount(
+        prefix,
+        HTTPAdapter(
+            pool_connections=settings.http_pool_size,
+            pool_maxsize=settings.http_pool_size,
+        ),
+    )
@@ -0,0 +1,89 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+_STOPWORDS = {
+    *"a an and any are as at be by can do for from has have how i if in is it its me my".split(),
+    *"no not of on or please some that the their them they this to up use user want".split(),
+    *"was we what when where which who will with would you your".split(),
+    "only",
+    "explicitely",
+    "explicitly",
+    "asks",
+    "tool",
+    "function",
+    "note",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    return [
+        token[:-1] if len(token) > 3 and token.endswith("s") else token
+        for token in tokens
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+@dataclass
+class ToolRouter:
+    documents: dict[str, Counter[str]]
+    k1: float = 1.2
+    b: float = 0.75
+    _idf: dict[str, float] = field(default_factory=lambda: {})
+    _average_length: float = 0
+
+    def __post_init__(self):
+        total = len(self.documents)
+        document_frequencies: Counter[str] = Counter()
+        for terms in self.documents.values():
+            document_frequencies.update(terms.keys())
+        self._idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+        lengths = [sum(terms.values()) for terms in self.documents.values()]
+        self._average_length = sum(lengths) / len(lengths) if lengths else 0
+
+    def score(self, query: str) -> dict[str, float]:
+        query_terms = set(tokenize(query))
+        scores: dict[str, float] = {}
+        for name, terms in self.documents.items():
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term, 0)
+                if frequency == 0:
+                    continue
+                score += (
+                    self._idf[term]
+                    * frequency
+                    * (self.k1 + 1)
+                    / (
+                        frequency
+                        + self.k1
+                        * (1 - self.b + self.b * length / self._average_length)
+                    )
+                )
+            scores[name] = score
+        return scores
+
+    def select(self, query: str, *, top_k: int, always: list[str]) -> list[str]:
+        scores = self.score(query)
+        relevant = sorted(
+            (name for name, score in scores.items() if score > 0),
+            key=lambda name: scores[name],
+            reverse=True,
+        )[:top_k]
+        # Small talk gets no tools at all, the always-on ones only ride along
+        # with turns that need a tool anyway
+        if len(relevant) == 0:
+            return []
+        return [name for name in self.documents if name in relevant or name in always]
+
+
+def create_tool_router(documents: dict[str, str]) -> ToolRouter:
+    return ToolRouter(
+        documents={name: Counter(tokenize(text)) for name, text in documents.items()}
+    )
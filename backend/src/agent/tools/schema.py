@@ -0,0 +1,85 @@
+import types
+import typing
+from typing import Any, Literal
+
+from ollama import Tool
+
+from src.agent.tools.binder import ToolBinder
+
+_JSON_TYPES: dict[Any, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    dict: "object",
+    list: "array",
+    tuple: "array",
+    set: "array",
+}
+
+
+def _literal_options(annotation: Any) -> list[Any] | None:
+    if typing.get_origin(annotation) is Literal:
+        return [*typing.get_args(annotation)]
+    if typing.get_origin(annotation) in [typing.Union, types.UnionType]:
+        options = [
+            _literal_options(arg)
+            for arg in typing.get_args(annotation)
+            if arg is not type(None)
+        ]
+        if all(option is not None for option in options):
+            return [value for option in options for value in option or []]
+    return None
+
+
+def _property_schema(annotation: Any) -> dict[str, Any]:
+    options = _literal_options(annotation)
+    if options is not None:
+        return {"type": _JSON_TYPES.get(type(options[0]), "string"), "enum": options}
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in [typing.Union, types.UnionType]:
+        schemas = [_property_schema(arg) for arg in args if arg is not type(None)]
+        json_types = [*dict.fromkeys(schema["type"] for schema in schemas)]
+        if len(json_types) == 1:
+            open_schemas = [schema for schema in schemas if "enum" not in schema]
+            return open_schemas[0] if len(open_schemas) > 0 else schemas[0]
+        return {"type": json_types}
+
+    json_type = _JSON_TYPES.get(origin or annotation, "string")
+    if json_type == "array":
+        return {
+            "type": json_type,
+            "items": _property_schema(args[0]) if len(args) > 0 else {},
+        }
+    return {"type": json_type}
+
+
+def create_tool_schema(
+    binder: ToolBinder, *, description: str, arg_descriptions: dict[str, str]
+) -> Tool:
+    return Tool.model_validate(
+        {
+            "type": "function",
+            "function": {
+                "name": binder.name,
+                "description": description,
+                "parameters": {
+                    "type": "object",
+                    "required": [
+                        parameter.name
+                        for parameter in binder.parameters
+                        if parameter.required
+                    ],
+                    "properties": {
+                        parameter.name: {
+                            **_property_schema(parameter.annotation),
+                            "description": arg_descriptions.get(parameter.name, ""),
+                        }
+                        for parameter in binder.parameters
+                    },
+                },
+            },
+        }
+    )
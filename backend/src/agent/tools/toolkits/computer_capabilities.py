@@ -1,7 +1,7 @@
 import subprocess
 from typing import Literal
 
-from src.agent.tools.tools import define_toolkit, description
+from src.agent.tools.tools import define_toolkit, description, uncacheable
 
 # FIXME(j4ndrw): Not registering toolkit, since I don't currently
 # know how to help the LLM distinguish between tools that need to be used
@@ -18,7 +18,8 @@ tool, _, _ = define_toolkit()
         """,
         args=[("kind", "The browser kind to open. Can be `personal` or `work`.")],
         returns=[("dict", "A JSON object, containing an error or a success status")],
-    )
+    ),
+    cache=uncacheable(),
 )
 def open_browser_on_computer(kind: Literal["personal"] | Literal["work"] | str) -> dict:
     if kind != "personal" and kind != "work":
@@ -51,7 +52,8 @@ def open_browser_on_computer(kind: Literal["personal"] | Literal["work"] | str)
         NOTE: Only use this tool if the user **explicitely** asks for the some jazz to be played.
         """,
         returns=[("dict", "A JSON object, containing an error or a success status")],
-    )
+    ),
+    cache=uncacheable(),
 )
 def play_some_jazz_on_computer() -> dict:
     song = "https://www.youtube.com/watch?v=i-8dosPqLE4"
@@ -1,14 +1,23 @@
-from ollama import Message
+from dataclasses import asdict, dataclass, field
 
-from src.agent.client import ollama_client
-from src.agent.models.conversation import history
-from src.agent.tools.tools import define_toolkit, description
-from src.agent.utils.prompt import SYSTEM_PROMPT
+from src.agent.jobs import reasoning_jobs
+from src.agent.models.conversation import current_session_id, sessions
+from src.agent.tools.tools import define_toolkit, description, uncacheable
 from src.settings.settings import settings
 
 tool, resource, register_toolkit = define_toolkit()
 
 
+@dataclass
+class BackgroundJob:
+    job_id: str
+    message: str = "Working on it. The answer will be announced when it's ready."
+    archetype: str = field(default_factory=lambda: "background-job")
+
+    def dict(self):
+        return {k: v for k, v in asdict(self).items()}
+
+
 @tool.create(
     description=description(
         """
@@ -16,11 +25,12 @@ tool, resource, register_toolkit = define_toolkit()
         NOTE: Only use this tool if the user **explicitely** asks for the conversation to be erased or forgotten.
         """,
         returns=[("dict", "A JSON object, containing an error or a success status")],
+        keywords=["reset", "start over", "wipe", "erase", "history", "fresh"],
     ),
+    cache=uncacheable(),
 )
 def forget_conversation() -> dict:
-    global history
-    history = [SYSTEM_PROMPT]
+    sessions.clear(current_session_id.get())
 
     return tool.success(forget_conversation.__name__)
 
@@ -31,6 +41,7 @@ def forget_conversation() -> dict:
         Delegates a task to a different language model, designed to solve complex reasoning tasks.
         For example, if the user asks for a logic puzzle to be solved, the reasoning language model
         will be asked to provide the solution.
+        The task runs in the background, so tell the user you're working on it. They will hear the answer when it's ready.
 
         NOTE: You will have to rephrase the task in such a way that it is clear for
         the reasoning model what needs to be done!
@@ -42,31 +53,28 @@ def forget_conversation() -> dict:
             )
         ],
         returns=[
-            ("str | dict", "The string response from the reasoning model or an error.")
+            (
+                "dict",
+                "A JSON object, containing the id of the background job or an error.",
+            )
         ],
+        keywords=["math", "calculate", "riddle", "solve", "think", "complex"],
     ),
+    cache=uncacheable(),
 )
-def delegate_task_to_reasoning_model(task: str) -> str | dict:
+async def delegate_task_to_reasoning_model(task: str) -> dict:
     if not task:
         return tool.error(
             delegate_task_to_reasoning_model.__name__,
             error="No task provided to reasoning model.",
         )
 
-    try:
-        content = ollama_client.chat(
-            model=settings.reasoning_llm,
-            messages=[Message(role="assistant", content=task)],
-        ).message.content
-        if not content:
-            return tool.error(
-                delegate_task_to_reasoning_model.__name__,
-                error="Reasoning model didn't respond with anything.",
-            )
-        return content
-    except Exception as e:
-        print(e)
+    job = reasoning_jobs.submit(
+        current_session_id.get(), task, model=settings.reasoning_llm
+    )
+    if job is None:
         return tool.error(
             delegate_task_to_reasoning_model.__name__,
-            error=f"Reasoning model request failed.",
+            error="The reasoning model is busy with other tasks. Ask the user to try again later.",
         )
+    return BackgroundJob(job_id=job.id).dict()
@@ -2,9 +2,9 @@ import urllib.parse
 from dataclasses import asdict, dataclass, field
 from typing import Any
 
-from src.agent.tools.tools import define_toolkit, description
+from src.agent.models.metadata import current_device_metadata
+from src.agent.tools.tools import cacheable, define_toolkit, description, uncacheable
 from src.agent.tools.utils import get_application_util
-from src.settings.settings import settings
 from src.utils import find_similar
 
 tool, resource, register_toolkit = define_toolkit()
@@ -43,6 +43,7 @@ def frontend_capability(*, kind: str, data: dict[str, Any]) -> dict:
             )
         ],
     ),
+    cache=cacheable(60 * 60, reads=["installedApps"]),
 )
 def open_application(application_name: str) -> dict:
     if not application_name:
@@ -77,6 +78,7 @@ def open_application(application_name: str) -> dict:
             )
         ],
     ),
+    cache=uncacheable(),
 )
 def send_whatsapp_message(to: str, message: str) -> dict:
     if not to:
@@ -94,16 +96,14 @@ def send_whatsapp_message(to: str, message: str) -> dict:
     if err:
         return err
 
-    contacts_map: dict[str, str] = settings.metadata.get("contacts", {})
+    contacts_map: dict[str, str] = current_device_metadata.get().get("contacts", {})
     if len(contacts_map.keys()) == 0:
         return tool.error(
             send_whatsapp_message.__name__,
             error="No contacts found on the user's mobile device",
         )
 
-    found_contact, similarity = find_similar(
-        contacts_map.keys(), to.lower(), lambda contact: contact.lower()
-    )
+    found_contact, similarity = find_similar(contacts_map.keys(), to.lower(), str.lower)
     if found_contact is None or similarity is None or similarity <= 0.2:
         return tool.error(
             send_whatsapp_message.__name__,
@@ -140,6 +140,7 @@ def send_whatsapp_message(to: str, message: str) -> dict:
             )
         ],
     ),
+    cache=cacheable(60 * 60, reads=["installedApps"]),
 )
 def search_on_youtube(search_query: str) -> dict:
     if not search_query:
@@ -165,7 +166,8 @@ def search_on_youtube(search_query: str) -> dict:
         NOTE: Only use this tool if the user **explicitely** asks for the some jazz to be played.
         """,
         returns=[("dict", "A JSON object, containing an error or a success status")],
-    )
+    ),
+    cache=cacheable(60 * 60, reads=["installedApps"]),
 )
 def play_some_jazz() -> dict:
     song = "https://www.youtube.com/watch?v=i-8dosPqLE4"
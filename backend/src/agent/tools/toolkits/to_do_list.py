@@ -1,11 +1,13 @@
-from src.agent.tools.tools import define_toolkit, description
-
-Todos = dict[str, bool]
-todos: Todos = {}
+from src.agent.models.todos import todo_store
+from src.agent.tools.tools import define_toolkit, description, uncacheable
 
 tool, resource, register_toolkit = define_toolkit()
 
 
+def _clean_items(items: list[str]) -> list[str]:
+    return [*dict.fromkeys(item.strip() for item in items if item.strip())]
+
+
 @resource.create(
     description=description(
         """
@@ -19,13 +21,10 @@ tool, resource, register_toolkit = define_toolkit()
             )
         ],
     ),
+    cache=uncacheable(),
 )
 def get_to_do_list_remaining_items() -> list[str]:
-    items: list[str] = []
-    for todo in todos.keys():
-        if not todos[todo]:
-            items.append(todo)
-    return items
+    return todo_store.items(completed=False)
 
 
 @resource.create(
@@ -38,58 +37,79 @@ def get_to_do_list_remaining_items() -> list[str]:
             ("list[str]", "The list of items that have been completed by the user")
         ],
     ),
+    cache=uncacheable(),
 )
 def get_to_do_done_items() -> list[str]:
-    items: list[str] = []
-    for todo in todos.keys():
-        if todos[todo]:
-            items.append(todo)
-    return items
+    return todo_store.items(completed=True)
 
 
 @tool.create(
     description=description(
         """
-        Adds an item to the to do list
-        NOTE: This function only runs if the user explicitely asks for the a to do item to be added
+        Adds one or more items to the to do list. Pass every item the user mentions in a single call.
+        NOTE: This function only runs if the user explicitely asks for to do items to be added
         """,
-        args=[("item", "The item to add to the to do list")],
+        args=[
+            (
+                "items",
+                'The items to add to the to do list. E.g. ["milk", "eggs", "bread"]',
+            )
+        ],
+        returns=[("dict", "A JSON object, containing an error or a success status")],
+        keywords=["todo", "task", "remind", "buy"],
     ),
+    cache=uncacheable(),
 )
-def add_item_to_to_do_list(item: str):
-    found_item = todos.get(item, None)
-    if found_item is not None:
-        todos[item] = False
+def add_items_to_to_do_list(items: list[str]) -> dict:
+    items = _clean_items(items)
+    if len(items) == 0:
+        return tool.error(add_items_to_to_do_list.__name__, error="No items provided.")
+
+    todo_store.add(items)
+    return tool.success(add_items_to_to_do_list.__name__)
 
 
 @tool.create(
     description=description(
         """
-        Removes an item from the to do list if it exists
-        NOTE: This function only runs if the user explicitely asks for the a to do item to be removed
+        Removes one or more items from the to do list if they exist
+        NOTE: This function only runs if the user explicitely asks for to do items to be removed
         """,
-        args=[("item", "The item to remove from the to do list")],
+        args=[("items", "The items to remove from the to do list")],
+        returns=[("dict", "A JSON object, containing an error or a success status")],
     ),
+    cache=uncacheable(),
 )
-def remove_items_from_to_do_list(item: str):
-    found_item = todos.get(item, None)
-    if found_item is not None:
-        del todos[item]
+def remove_items_from_to_do_list(items: list[str]) -> dict:
+    if todo_store.remove(_clean_items(items)) == 0:
+        return tool.error(
+            remove_items_from_to_do_list.__name__,
+            error="None of these items are on the to do list.",
+        )
+    return tool.success(remove_items_from_to_do_list.__name__)
 
 
 @tool.create(
     description=description(
         """
-        Marks a to do item as completed or not completed
-        NOTE: This function only runs if the user explicitely asks for the a to do item to be marked
+        Marks one or more to do items as completed or not completed
+        NOTE: This function only runs if the user explicitely asks for to do items to be marked
         """,
         args=[
-            ("item", "The item in the to do list to mark"),
-            ("completed", "The item to remove from the to do list"),
+            ("items", "The items in the to do list to mark"),
+            (
+                "completed",
+                "Whether the items have been completed (true) or not (false)",
+            ),
         ],
+        returns=[("dict", "A JSON object, containing an error or a success status")],
     ),
+    cache=uncacheable(),
 )
-def mark_to_do_item(item: str, completed: bool):
-    found_item = todos.get(item, None)
-    if found_item is not None:
-        todos[item] = completed
+def mark_to_do_items(items: list[str], completed: bool) -> dict:
+    if todo_store.mark(_clean_items(items), completed=completed) == 0:
+        return tool.error(
+            mark_to_do_items.__name__,
+            error="None of these items are on the to do list.",
+        )
+    return tool.success(mark_to_do_items.__name__)
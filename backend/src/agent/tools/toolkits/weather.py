@@ -1,10 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-from src.agent.tools.tools import define_toolkit, description
+from src.agent.models.metadata import current_device_metadata
+from src.agent.tools.http import http_session
+from src.agent.tools.tools import cacheable, define_toolkit, description
 from src.settings.settings import settings
+from src.utils import TTLCache
 
 _, resource, register_toolkit = define_toolkit()
 
+Coordinates = tuple[float, float]
+
+forecasts = TTLCache(ttl=settings.weather_ttl, max_size=64)
+_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather")
+_refreshing: set[Coordinates] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _grid_coordinates(gps_position: dict | None) -> Coordinates | None:
+    # Open Meteo is queried on a 0.01 degree grid, so positions within the same
+    # cell share a forecast.
+    if gps_position is None:
+        return None
+    latitude = gps_position.get("latitude")
+    longitude = gps_position.get("longitude")
+    if latitude is None or longitude is None:
+        return None
+    return round(latitude, 2), round(longitude, 2)
+
+
+def _fetch_forecast(coordinates: Coordinates) -> dict:
+    latitude, longitude = coordinates
+    response = http_session.get(
+        settings.weather_api_url,
+        params={
+            "latitude": f"{latitude:.2f}",
+            "longitude": f"{longitude:.2f}",
+            "daily": "precipitation_sum,sunrise,sunset,precipitation_hours,temperature_2m_min,temperature_2m_max",
+            "timezone": "auto",
+            "current": "temperature_2m,precipitation,is_day",
+        },
+        timeout=settings.weather_timeout,
+    )
+    response.raise_for_status()
+    forecast = response.json()
+    forecasts.set(coordinates, forecast)
+    return forecast
+
+
+def _refresh_forecast(coordinates: Coordinates):
+    try:
+        _fetch_forecast(coordinates)
+    except requests.RequestException as e:
+        print(e)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(coordinates)
+
+
+def _schedule_refresh(coordinates: Coordinates):
+    with _refreshing_lock:
+        if coordinates in _refreshing:
+            return
+        _refreshing.add(coordinates)
+    _refresher.submit(_refresh_forecast, coordinates)
+
 
 @resource.create(
     description=description(
@@ -17,25 +79,47 @@ _, resource, register_toolkit = define_toolkit()
                 "API response from Open Meteo that contains various data that needs to be interpreted.",
             )
         ],
-    )
+        keywords=["forecast", "temperature", "rain", "snow", "sunny", "cold", "hot"],
+    ),
+    cache=cacheable(
+        60 * 10, reads=["gpsPosition"], views={"gpsPosition": _grid_coordinates}
+    ),
 )
 def get_weather() -> dict:
-    gps_position = settings.metadata.get("gpsPosition")
+    gps_position = current_device_metadata.get().get("gpsPosition")
     if gps_position is None:
         return resource.error(
             get_weather.__name__,
             error="Could not determine weather - no GPS position was found on the user's device.",
         )
 
-    latitude = gps_position.get("latitude")
-    longitude = gps_position.get("longitude")
-    if latitude is None or longitude is None:
+    coordinates = _grid_coordinates(gps_position)
+    if coordinates is None:
         return resource.error(
             get_weather.__name__,
             error="Could not determine weather - no latitude/longitude was found on the user's device.",
         )
 
-    response = requests.get(
-        f"https://api.open-meteo.com/v1/forecast?latitude={latitude:.2f}&longitude={longitude:.2f}&daily=precipitation_sum,sunrise,sunset,precipitation_hours,temperature_2m_min,temperature_2m_max&timezone=auto&current=temperature_2m,precipitation,is_day"
-    )
-    return response.json()
+    cached = forecasts.get_with_age(coordinates)
+    if cached is not None:
+        forecast, age = cached
+        if age <= settings.weather_ttl:
+            return forecast
+        if age <= settings.weather_ttl + settings.weather_stale_ttl:
+            _schedule_refresh(coordinates)
+            return forecast
+
+    try:
+        return _fetch_forecast(coordinates)
+    except requests.RequestException as e:
+        print(e)
+        if cached is not None:
+            forecast, age = cached
+            return {
+                **forecast,
+                "warning": f"Open Meteo could not be reached, this forecast is {int(age // 60)} minutes old.",
+            }
+        return resource.error(
+            get_weather.__name__,
+            error="Could not determine weather - Open Meteo could not be reached.",
+        )
@@ -1,23 +1,59 @@
 import importlib.util
 import inspect
 import os
+import sys
 from dataclasses import asdict, dataclass, field
 from functools import wraps
 from typing import Any, Callable, Literal
 
-from ollama import Message
+from ollama import Tool
+
+from src.agent.tools.binder import ToolBinder, create_tool_binder
+from src.agent.tools.router import ToolRouter, create_tool_router
+from src.agent.tools.schema import create_tool_schema
+from src.settings.settings import settings
 
 ToolRepository = dict[str, Callable]
-ToolHandlers = dict[Callable, Callable[[Message.ToolCall], list[Any]]]
+ToolDispatch = dict[str, ToolBinder]
+ToolTimeouts = dict[str, float]
+ToolDescriptions = dict[str, "_Description"]
+ToolCachePolicies = dict[str, "_CachePolicy"]
+ToolSchemas = dict[str, Tool]
+FunctionKind = Literal["tool"] | Literal["resource"]
 
 
 @dataclass
 class Toolkit:
     repository: ToolRepository
-    handlers: ToolHandlers
+    dispatch: ToolDispatch
+    timeouts: ToolTimeouts = field(default_factory=lambda: {})
+    descriptions: ToolDescriptions = field(default_factory=lambda: {})
+    cache_policies: ToolCachePolicies = field(default_factory=lambda: {})
+    schemas: ToolSchemas = field(default_factory=lambda: {})
+
+
+@dataclass
+class ToolRegistry:
+    repository: ToolRepository = field(default_factory=lambda: {})
+    dispatch: ToolDispatch = field(default_factory=lambda: {})
+    timeouts: ToolTimeouts = field(default_factory=lambda: {})
+    descriptions: ToolDescriptions = field(default_factory=lambda: {})
+    cache_policies: ToolCachePolicies = field(default_factory=lambda: {})
+    schemas: ToolSchemas = field(default_factory=lambda: {})
+    tools: list[Tool] = field(default_factory=lambda: [])
+    tool_blocks: dict[tuple[str, ...], list[Tool]] = field(default_factory=lambda: {})
+    router: ToolRouter = field(default_factory=lambda: create_tool_router({}))
 
 
-toolkits: list[Toolkit] = []
+@dataclass
+class _ToolkitModule:
+    name: str
+    mtime: float
+    toolkit: Toolkit | None
+
+
+_toolkit_modules: dict[str, _ToolkitModule] = {}
+_tool_registries: dict[str, ToolRegistry] = {}
 
 
 @dataclass
@@ -25,11 +61,60 @@ class _Description:
     details: str
     args: list[tuple[str, str]] = field(default_factory=lambda: [])
     returns: list[tuple[str, str]] = field(default_factory=lambda: [])
+    keywords: list[str] = field(default_factory=lambda: [])
+
+    def text(self) -> str:
+        return " ".join(
+            [
+                self.details,
+                *(f"{name} {details}" for name, details in self.args),
+                *(details for _, details in self.returns),
+                *self.keywords,
+            ]
+        )
+
+    def docstring(self, kind: FunctionKind, *, with_args: bool = True) -> str:
+        lines = [
+            f"Function type: {kind.capitalize()}",
+            "---",
+            inspect.cleandoc(self.details),
+        ]
+        if with_args and len(self.args) > 0:
+            lines.extend(
+                [
+                    "",
+                    "Args:",
+                    *(f"    {name}: {details}" for name, details in self.args),
+                ]
+            )
+        if len(self.returns) > 0:
+            lines.extend(
+                [
+                    "",
+                    "Returns:",
+                    *(
+                        f"    {return_type}: {details}"
+                        for return_type, details in self.returns
+                    ),
+                ]
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class _CachePolicy:
+    ttl: float = 0
+    reads: list[str] = field(default_factory=lambda: [])
+    views: dict[str, Callable[[Any], Any]] = field(default_factory=lambda: {})
+
+    @property
+    def cacheable(self) -> bool:
+        return self.ttl > 0
 
 
 @dataclass
 class _Error:
-    function_kind: Literal["tool"] | Literal["resource"]
+    function_kind: FunctionKind
     function_origin: str
     error: str
 
@@ -50,17 +135,21 @@ def create_tool_repository(*functions: Callable) -> ToolRepository:
     return {function.__name__: function for function in functions}
 
 
-def create_tool_handlers() -> ToolHandlers:
+def create_tool_dispatch() -> ToolDispatch:
     return {}
 
 
 def create_toolkit():
-    return Toolkit(repository=create_tool_repository(), handlers=create_tool_handlers())
+    return Toolkit(repository=create_tool_repository(), dispatch=create_tool_dispatch())
 
 
 def _update_toolkit(
     *,
     toolkit: Toolkit,
+    kind: FunctionKind,
+    description: _Description | None = None,
+    timeout: float | None = None,
+    cache: _CachePolicy | None = None,
 ):
     def decorator(func: Callable):
         @wraps(func)
@@ -68,15 +157,29 @@ def _update_toolkit(
             return func(*args, **kwargs)
 
         toolkit.repository = {**toolkit.repository, **create_tool_repository(wrapper)}
-        toolkit.handlers = {
-            **toolkit.handlers,
-            wrapper: lambda tool_call: [
-                *map(
-                    lambda arg: tool_call.function.arguments.get(arg),
-                    [*inspect.signature(wrapper).parameters.keys()],
-                )
-            ],
+        binder = create_tool_binder(wrapper)
+        toolkit.dispatch = {**toolkit.dispatch, wrapper.__name__: binder}
+        toolkit.schemas = {
+            **toolkit.schemas,
+            wrapper.__name__: create_tool_schema(
+                binder,
+                description=(
+                    inspect.cleandoc(wrapper.__doc__ or wrapper.__name__)
+                    if description is None
+                    else description.docstring(kind, with_args=False)
+                ),
+                arg_descriptions={} if description is None else dict(description.args),
+            ),
         }
+        if timeout is not None:
+            toolkit.timeouts = {**toolkit.timeouts, wrapper.__name__: timeout}
+        if cache is not None:
+            toolkit.cache_policies = {**toolkit.cache_policies, wrapper.__name__: cache}
+        if description is not None:
+            toolkit.descriptions = {
+                **toolkit.descriptions,
+                wrapper.__name__: description,
+            }
 
         return wrapper
 
@@ -85,7 +188,7 @@ def _update_toolkit(
 
 def _update_function_docstring(
     *,
-    kind: Literal["tool"] | Literal["resource"],
+    kind: FunctionKind,
     description: _Description | None = None,
 ):
     def decorator(func: Callable):
@@ -93,22 +196,8 @@ def _update_function_docstring(
         def wrapper(*args, **kwargs):
             return func(*args, **kwargs)
 
-        if description is None:
-            return wrapper
-
-        wrapper.__doc__ = f"\n    Function type: {kind.capitalize()}"
-        wrapper.__doc__ = f"\n    ---"
-        wrapper.__doc__ = f"{description.details}"
-        if len(description.args) > 0:
-            wrapper.__doc__ += "\n\n    Args"
-            wrapper.__doc__ += "\n        ".join(
-                [*map(lambda arg: f"{arg[0]}: {arg[1]}", description.args)]
-            )
-        if len(description.returns) > 0:
-            wrapper.__doc__ += "\n\n    Returns"
-            wrapper.__doc__ += "\n        ".join(
-                [*map(lambda ret: f"{ret[0]}: {ret[1]}", description.returns)]
-            )
+        if description is not None:
+            wrapper.__doc__ = description.docstring(kind)
 
         return wrapper
 
@@ -117,16 +206,24 @@ def _update_function_docstring(
 
 def define_toolkit():
     toolkit = create_toolkit()
-    register_toolkit = lambda: toolkits.append(toolkit)
+    register_toolkit = lambda: toolkit
 
     class tool:
         @staticmethod
         def create(
             *,
             description: _Description | None = None,
+            timeout: float | None = None,
+            cache: _CachePolicy | None = None,
         ):
             def decorator(func: Callable):
-                @_update_toolkit(toolkit=toolkit)
+                @_update_toolkit(
+                    toolkit=toolkit,
+                    kind="tool",
+                    description=description,
+                    timeout=timeout,
+                    cache=cache,
+                )
                 @_update_function_docstring(kind="tool", description=description)
                 @wraps(func)
                 def wrapper(*args, **kwargs):
@@ -151,9 +248,17 @@ def define_toolkit():
         def create(
             *,
             description: _Description | None = None,
+            timeout: float | None = None,
+            cache: _CachePolicy | None = None,
         ):
             def decorator(func: Callable):
-                @_update_toolkit(toolkit=toolkit)
+                @_update_toolkit(
+                    toolkit=toolkit,
+                    kind="resource",
+                    description=description,
+                    timeout=timeout,
+                    cache=cache,
+                )
                 @_update_function_docstring(kind="resource", description=description)
                 @wraps(func)
                 def wrapper(*args, **kwargs):
@@ -197,30 +302,120 @@ def description(
     *,
     args: list[tuple[str, str]] | None = None,
     returns: list[tuple[str, str]] | None = None,
+    keywords: list[str] | None = None,
 ) -> _Description:
-    return _Description(details=details, args=args or [], returns=returns or [])
+    return _Description(
+        details=details, args=args or [], returns=returns or [], keywords=keywords or []
+    )
 
 
-def load_toolkits(path: str) -> list[Toolkit]:
-    for dirpath, _, filenames in os.walk(os.path.abspath(path)):
-        for filename in filenames:
-            if filename.endswith(".py") and filename != "__init__.py":
-                module_name = filename[:-3]
-                module_path = os.path.join(dirpath, filename)
+def cacheable(
+    ttl: float,
+    *,
+    reads: list[str] | None = None,
+    views: dict[str, Callable[[Any], Any]] | None = None,
+) -> _CachePolicy:
+    # A view maps a metadata section to the part the tool's answer depends on,
+    # so changes the tool can't see don't invalidate the cached answer.
+    return _CachePolicy(ttl=ttl, reads=reads or [], views=views or {})
 
-                package_name = os.path.relpath(dirpath, start=os.path.curdir).replace(
-                    os.path.sep, "."
-                )
-                full_module_name = (
-                    f"{package_name}.{module_name}" if package_name else module_name
-                )
-                spec = importlib.util.spec_from_file_location(
-                    full_module_name, module_path
-                )
-                if spec is not None and spec.loader is not None:
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
 
-                    if hasattr(module, "register_toolkit"):
-                        module.register_toolkit()
-    return toolkits
+def uncacheable() -> _CachePolicy:
+    return _CachePolicy(ttl=0)
+
+
+def _find_toolkit_modules(path: str) -> list[str]:
+    module_paths: list[str] = []
+    for dirpath, _, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            if filename.endswith(".py") and filename != "__init__.py":
+                module_paths.append(os.path.join(dirpath, filename))
+    return module_paths
+
+
+def _import_toolkit_module(module_path: str, *, mtime: float) -> _ToolkitModule:
+    dirpath, filename = os.path.split(module_path)
+    module_name = filename[:-3]
+    package_name = os.path.relpath(dirpath, start=os.path.curdir).replace(
+        os.path.sep, "."
+    )
+    full_module_name = f"{package_name}.{module_name}" if package_name else module_name
+
+    toolkit: Toolkit | None = None
+    spec = importlib.util.spec_from_file_location(full_module_name, module_path)
+    if spec is not None and spec.loader is not None:
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[full_module_name] = module
+        spec.loader.exec_module(module)
+
+        if hasattr(module, "register_toolkit"):
+            toolkit = module.register_toolkit()
+
+    return _ToolkitModule(name=full_module_name, mtime=mtime, toolkit=toolkit)
+
+
+def _routing_document(name: str, description: _Description | None) -> str:
+    words = name.replace("_", " ")
+    return words if description is None else f"{words} {description.text()}"
+
+
+def _build_tool_registry(module_paths: list[str]) -> ToolRegistry:
+    registry = ToolRegistry()
+    for module_path in module_paths:
+        toolkit = _toolkit_modules[module_path].toolkit
+        if toolkit is None:
+            continue
+        registry.repository.update(toolkit.repository)
+        registry.dispatch.update(toolkit.dispatch)
+        registry.timeouts.update(toolkit.timeouts)
+        registry.descriptions.update(toolkit.descriptions)
+        registry.cache_policies.update(toolkit.cache_policies)
+        registry.schemas.update(toolkit.schemas)
+    registry.tools = [*registry.schemas.values()]
+    registry.router = create_tool_router(
+        {
+            name: _routing_document(name, registry.descriptions.get(name))
+            for name in registry.repository
+        }
+    )
+    return registry
+
+
+def tool_block(tool_registry: ToolRegistry, names: list[str]) -> list[Tool]:
+    key = tuple(names)
+    block = tool_registry.tool_blocks.get(key)
+    if block is None:
+        block = tool_registry.tool_blocks[key] = [
+            tool_registry.schemas[name] for name in names
+        ]
+    return block
+
+
+def load_toolkits(path: str) -> ToolRegistry:
+    path = os.path.abspath(path)
+    registry = _tool_registries.get(path)
+    if registry is not None and not settings.toolkits_hot_reload:
+        return registry
+
+    module_paths = _find_toolkit_modules(path)
+    changed = registry is None
+    for module_path in module_paths:
+        mtime = os.stat(module_path).st_mtime
+        loaded_module = _toolkit_modules.get(module_path)
+        if loaded_module is not None and loaded_module.mtime == mtime:
+            continue
+        _toolkit_modules[module_path] = _import_toolkit_module(module_path, mtime=mtime)
+        changed = True
+
+    for module_path in [*_toolkit_modules.keys()]:
+        if (
+            module_path.startswith(path + os.path.sep)
+            and module_path not in module_paths
+        ):
+            sys.modules.pop(_toolkit_modules.pop(module_path).name, None)
+            changed = True
+
+    if changed:
+        registry = _build_tool_registry(module_paths)
+        _tool_registries[path] = registry
+    return registry
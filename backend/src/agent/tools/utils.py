@@ -1,19 +1,23 @@
+from src.agent.models.metadata import current_device_metadata
 from src.agent.tools.tools import tool
-from src.settings.settings import settings
 from src.utils import find_similar
 
 
+def application_key(package: str) -> str:
+    return package.split(".")[-1].lower()
+
+
 def get_application_util(
     origin: str, *, app_name: str
 ) -> tuple[str | None, dict | None]:
-    installed_apps: list[str] = settings.metadata.get("installedApps", [])
+    installed_apps: list[str] = current_device_metadata.get().get("installedApps", [])
     if len(installed_apps) == 0:
         return None, tool.error(
             origin, error="No applications installed on the user's device."
         )
 
     found_app, similarity = find_similar(
-        installed_apps, app_name.lower(), lambda app: app.split(".")[-1].lower()
+        installed_apps, app_name.lower(), application_key
     )
     if found_app is None or similarity is None or similarity <= 0.5:
         return None, tool.error(
@@ -1,4 +1,11 @@
-from ollama import Message
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+from ollama import ChatResponse, Message
+
+from src.serialization import dumps_text
+from src.settings.settings import settings
 
 SYSTEM_PROMPT = Message(
     role="system",
@@ -27,3 +34,62 @@ SYSTEM_PROMPT = Message(
     </proof-reading>
 """,
 )
+
+
+@dataclass
+class PromptCacheStats:
+    calls: int = 0
+    prompt_tokens: float = 0
+    evaluated_tokens: int = 0
+    prompt_eval_seconds: float = 0
+    chars_per_token: float = 4
+    last_prompt: str = field(default="", repr=False)
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.prompt_tokens == 0:
+            return 0
+        return max(0, 1 - self.evaluated_tokens / self.prompt_tokens)
+
+
+prompt_cache_stats: dict[str, PromptCacheStats] = {}
+
+
+def canonical_messages(history: list[Message]) -> list[Message]:
+    return [
+        SYSTEM_PROMPT,
+        *(message for message in history if message.role != "system"),
+    ]
+
+
+def model_options(model: str) -> dict[str, Any]:
+    if model == settings.reasoning_llm:
+        keep_alive, num_ctx = (
+            settings.reasoning_llm_keep_alive,
+            settings.reasoning_llm_num_ctx,
+        )
+    else:
+        keep_alive, num_ctx = settings.llm_keep_alive, settings.llm_num_ctx
+    return {"keep_alive": keep_alive, "options": {"num_ctx": num_ctx}}
+
+
+def record_prompt_eval(
+    model: str, messages: list[Message], response: ChatResponse
+) -> PromptCacheStats:
+    stats = prompt_cache_stats.setdefault(model, PromptCacheStats())
+    if response.prompt_eval_count is None:
+        return stats
+
+    prompt = dumps_text([message.model_dump(exclude_none=True) for message in messages])
+    evaluated_tokens = response.prompt_eval_count
+    reused_chars = len(os.path.commonprefix([stats.last_prompt, prompt]))
+
+    if reused_chars == 0 and evaluated_tokens > 0:
+        stats.chars_per_token = len(prompt) / evaluated_tokens
+
+    stats.calls += 1
+    stats.prompt_tokens += max(evaluated_tokens, len(prompt) / stats.chars_per_token)
+    stats.evaluated_tokens += evaluated_tokens
+    stats.prompt_eval_seconds += (response.prompt_eval_duration or 0) / 1e9
+    stats.last_prompt = prompt
+    return stats
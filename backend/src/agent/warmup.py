@@ -0,0 +1,107 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Literal
+
+from ollama import Message
+
+from src.agent.client import ollama_client
+from src.agent.scheduler import Priority, scheduler
+from src.agent.tools.tools import load_toolkits, tool_block
+from src.agent.utils.prompt import canonical_messages, model_options
+from src.metrics import record_llm_call, span
+from src.settings.settings import settings
+
+ModelStatus = Literal["cold", "loading", "warm", "failed"]
+
+
+def _tagged(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+@dataclass
+class Warmup:
+    ready: bool = False
+    models: dict[str, ModelStatus] = field(default_factory=lambda: {})
+    last_warmed_at: float | None = None
+    error: str | None = None
+
+    def dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "models": self.models,
+            "last_warmed_at": self.last_warmed_at,
+            "error": self.error,
+        }
+
+    async def _loaded_models(self) -> set[str]:
+        return {
+            _tagged(model.model or model.name or "")
+            for model in (await ollama_client.ps()).models
+        }
+
+    async def _load(self, model: str):
+        self.models[model] = "loading"
+        async with scheduler.slot(model, Priority.BACKGROUND):
+            with span("warmup", model=model):
+                await ollama_client.chat(
+                    model=model, messages=[], **model_options(model)
+                )
+        self.models[model] = "warm"
+
+    async def _prime_prefix(self):
+        tool_registry = load_toolkits(settings.toolkits_path)
+        tools = tool_block(
+            tool_registry,
+            tool_registry.router.select(
+                "",
+                top_k=settings.tool_router_top_k,
+                always=settings.tool_router_always,
+            ),
+        )
+        options = model_options(settings.llm)
+        async with scheduler.slot(settings.llm, Priority.BACKGROUND):
+            with span("warmup_prefix", model=settings.llm):
+                response = await ollama_client.chat(
+                    model=settings.llm,
+                    messages=canonical_messages([Message(role="user", content="Hi")]),
+                    tools=(
+                        tools if settings.tool_router_enabled else tool_registry.tools
+                    ),
+                    keep_alive=options["keep_alive"],
+                    options={**options["options"], "num_predict": 1},
+                )
+        record_llm_call(settings.llm, response)
+
+    async def warm(self):
+        models = [*dict.fromkeys([settings.llm, settings.reasoning_llm])]
+        loaded = await self._loaded_models()
+        for model in models:
+            if _tagged(model) in loaded:
+                self.models[model] = "warm"
+                continue
+            try:
+                await self._load(model)
+            except Exception:
+                self.models[model] = "failed"
+                raise
+            if model == settings.llm:
+                await self._prime_prefix()
+        self.last_warmed_at = time.time()
+
+    async def run(self):
+        while True:
+            try:
+                await self.warm()
+                self.ready, self.error = True, None
+            except Exception as e:
+                print(f"WARM-UP: {e}")
+                self.error = str(e)
+            if self.ready and settings.warmup_interval <= 0:
+                return
+            await asyncio.sleep(
+                settings.warmup_interval if self.ready else settings.warmup_retry
+            )
+
+
+warmup = Warmup()
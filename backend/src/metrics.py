@@ -0,0 +1,210 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from ollama import ChatResponse
+
+from src.serialization import dumps_text
+from src.settings.settings import settings
+
+Labels = tuple[tuple[str, str], ...]
+
+_lock = threading.RLock()
+
+DURATION_BUCKETS = [
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+]
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = [*labels, *([] if extra is None else [extra])]
+    if len(pairs) == 0:
+        return ""
+    escaped = [
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    ]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+@dataclass
+class Counter:
+    name: str
+    help: str
+    values: dict[Labels, float] = field(default_factory=lambda: {})
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _labels(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+            *(
+                f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+                for labels, value in self.values.items()
+            ),
+        ]
+
+
+@dataclass
+class _HistogramSeries:
+    buckets: list[int]
+    sum: float = 0
+    count: int = 0
+
+
+@dataclass
+class Histogram:
+    name: str
+    help: str
+    buckets: list[float] = field(default_factory=lambda: DURATION_BUCKETS)
+    series: dict[Labels, _HistogramSeries] = field(default_factory=lambda: {})
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        with _lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _HistogramSeries([0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series.buckets[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self.series.items():
+            for bound, count in zip(self.buckets, series.buckets):
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}"
+                )
+            lines.extend(
+                [
+                    f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series.count}",
+                    f"{self.name}_sum{_format_labels(labels)} {_format_value(series.sum)}",
+                    f"{self.name}_count{_format_labels(labels)} {series.count}",
+                ]
+            )
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(
+        self, name: str, help: str, buckets: list[float] = DURATION_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def _register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with _lock:
+            lines = [
+                line for metric in self.metrics.values() for line in metric.render()
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "lola_stage_duration_seconds", "Wall-clock time spent in each stage of a turn."
+)
+llm_calls = metrics.counter("lola_llm_calls_total", "Chat requests sent to Ollama.")
+llm_total_seconds = metrics.histogram(
+    "lola_llm_total_duration_seconds",
+    "Ollama-reported total_duration per chat request.",
+)
+llm_load_seconds = metrics.histogram(
+    "lola_llm_load_duration_seconds",
+    "Ollama-reported load_duration per chat request, high values mean a model reload.",
+)
+llm_prompt_eval_tokens = metrics.counter(
+    "lola_llm_prompt_eval_tokens_total", "Prompt tokens evaluated by Ollama."
+)
+llm_eval_tokens = metrics.counter(
+    "lola_llm_eval_tokens_total", "Tokens generated by Ollama."
+)
+turns_interrupted = metrics.counter(
+    "lola_turns_interrupted_total", "Turns cancelled by a newer utterance."
+)
+tool_errors = metrics.counter(
+    "lola_tool_errors_total", "Tool calls that timed out or raised."
+)
+response_cache_hits = metrics.counter(
+    "lola_response_cache_hits_total", "Turns answered from the response cache."
+)
+response_cache_misses = metrics.counter(
+    "lola_response_cache_misses_total", "Response cache lookups without a fresh answer."
+)
+response_cache_skips = metrics.counter(
+    "lola_response_cache_skips_total", "Turns not stored because they aren't cacheable."
+)
+
+
+def log_event(event: str, **fields):
+    if not settings.json_logs:
+        return
+    print(dumps_text({"ts": time.time(), "event": event, **fields}))
+
+
+@contextmanager
+def span(stage: str, **labels: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        stage_seconds.observe(seconds, stage=stage, **labels)
+        log_event("span", stage=stage, seconds=round(seconds, 6), **labels)
+
+
+def record_llm_call(model: str, response: ChatResponse):
+    total = (response.total_duration or 0) / 1e9
+    load = (response.load_duration or 0) / 1e9
+    llm_calls.inc(model=model)
+    llm_total_seconds.observe(total, model=model)
+    llm_load_seconds.observe(load, model=model)
+    llm_prompt_eval_tokens.inc(response.prompt_eval_count or 0, model=model)
+    llm_eval_tokens.inc(response.eval_count or 0, model=model)
+    log_event(
+        "llm",
+        model=model,
+        total_duration=total,
+        load_duration=load,
+        prompt_eval_count=response.prompt_eval_count,
+        eval_count=response.eval_count,
+    )
@@ -0,0 +1,65 @@
+import gzip
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(value: Any, *, sort_keys: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(value, default=str, option=option)
+    return json.dumps(
+        value,
+        default=str,
+        sort_keys=sort_keys,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode()
+
+
+def dumps_text(value: Any, *, sort_keys: bool = False) -> str:
+    return dumps(value, sort_keys=sort_keys).decode()
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def ndjson_line(value: Any) -> bytes:
+    return dumps(value) + b"\n"
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for token in accept_encoding.split(","):
+        name, _, params = token.strip().partition(";")
+        if params.replace(" ", "") not in ["q=0", "q=0.0"]:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress(
+    body: bytes, *, accept_encoding: str, min_bytes: int
+) -> tuple[bytes, str | None]:
+    if len(body) < min_bytes:
+        return body, None
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=4), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
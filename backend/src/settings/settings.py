@@ -1,13 +1,61 @@
-from typing import Any
-
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     secret: str = ""
+    ollama_host: str = "http://localhost:7869"
     llm: str = ""
     reasoning_llm: str = ""
-    metadata: dict[str, Any] = {}
+    llm_keep_alive: str = "30m"
+    llm_num_ctx: int = 8192
+    reasoning_llm_keep_alive: str = "10m"
+    reasoning_llm_num_ctx: int = 8192
+    warmup_enabled: bool = True
+    warmup_interval: float = 60 * 5
+    warmup_retry: float = 10
+    assistant_name: str = "Lola"
+
+    json_logs: bool = False
+    compression_min_bytes: int = 1024
+    intent_fast_path: bool = True
+    intent_min_confidence: float = 0.75
+    intent_min_slot_similarity: float = 0.8
+    response_cache_enabled: bool = True
+    response_cache_ttl: float = 60 * 10
+    response_cache_size: int = 256
+    http_pool_size: int = 8
+    weather_api_url: str = "https://api.open-meteo.com/v1/forecast"
+    weather_timeout: float = 3
+    weather_ttl: float = 60 * 10
+    weather_stale_ttl: float = 60 * 60 * 3
+    toolkits_path: str = "./src/agent/tools/toolkits"
+    toolkits_hot_reload: bool = False
+
+    todo_db_path: str = "./data/todos.db"
+    journal_enabled: bool = True
+    journal_path: str = "./data/journal"
+    journal_fsync_interval: float = 0.2
+    journal_segment_bytes: int = 1024 * 1024
+
+    tool_workers: int = 4
+    tool_timeout: float = 20
+    reasoning_workers: int = 1
+    reasoning_max_pending_jobs: int = 8
+    reasoning_job_ttl: float = 60 * 60
+    job_max_wait: float = 30
+
+    scheduler_concurrency: dict[str, int] = {}
+    scheduler_default_concurrency: int = 1
+    scheduler_max_queue: int = 8
+
+    tool_router_enabled: bool = True
+    tool_router_top_k: int = 3
+    tool_router_always: list[str] = ["forget_conversation"]
+    agent_max_steps: int = 4
+    agent_max_tokens: int = 16384
+    max_sessions: int = 8
+    session_idle_ttl: float = 60 * 60 * 6
+    session_max_turns: int = 20
     model_config = SettingsConfigDict(env_file="../../.env")
 
 
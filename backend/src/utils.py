@@ -1,19 +1,162 @@
+import heapq
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
 from difflib import SequenceMatcher
-from typing import Callable, Iterable
+from typing import Any, Callable, Hashable, Iterable
+
+_SENTENCE_BOUNDARY = re.compile(r"""(?<=[.!?])\s+|(?<=[.!?]["')\]])\s+|\n+""")
+_FUZZY_INDEX_CACHE_SIZE = 32
 
 
 def levenshtein_distance(a: str, b: str) -> float:
     return SequenceMatcher(None, a, b).ratio()
 
 
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class FuzzyIndex:
+    candidates: list[str]
+    keys: list[str]
+    postings: dict[str, list[int]] = field(default_factory=lambda: {})
+    trigram_counts: list[int] = field(default_factory=lambda: [])
+
+    def __post_init__(self):
+        for position, key in enumerate(self.keys):
+            trigrams = _trigrams(key)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, []).append(position)
+
+    def top_k(
+        self, key: str, k: int = 1, *, shortlist_size: int = 16
+    ) -> list[tuple[str, float]]:
+        trigrams = _trigrams(key)
+        overlaps: Counter[int] = Counter()
+        for trigram in trigrams:
+            overlaps.update(self.postings.get(trigram, []))
+
+        # Dice coefficient, so long candidates don't win on raw overlap alone
+        dice = sorted(
+            (
+                (
+                    2 * overlap / (len(trigrams) + self.trigram_counts[position]),
+                    position,
+                )
+                for position, overlap in overlaps.items()
+            ),
+            reverse=True,
+        )
+        cutoff = dice[min(shortlist_size, len(dice)) - 1][0] if len(dice) > 0 else 0
+        # Trigrams say little about very short keys, and small lists are cheap
+        # to scan in full
+        exhaustive = (
+            len(dice) == 0 or len(key) <= 3 or len(self.keys) <= 4 * shortlist_size
+        )
+        shortlist = (
+            range(len(self.keys))
+            if exhaustive
+            else [position for score, position in dice if score >= cutoff]
+        )
+        return heapq.nlargest(
+            k,
+            (
+                (
+                    self.candidates[position],
+                    levenshtein_distance(key, self.keys[position]),
+                )
+                for position in shortlist
+            ),
+            key=lambda x: x[1],
+        )
+
+
+_fuzzy_indexes: OrderedDict[tuple[tuple[str, ...], object], FuzzyIndex] = OrderedDict()
+
+
+def fuzzy_index(
+    xs: Iterable[str], mapper: Callable[[str], str] = lambda x: x
+) -> FuzzyIndex:
+    candidates = (*xs,)
+    # Keyed on the mapper object: pass a module-level function, not a lambda
+    # built per call, to reuse the index
+    cache_key = (candidates, mapper)
+    index = _fuzzy_indexes.get(cache_key)
+    if index is None:
+        index = FuzzyIndex(
+            candidates=[*candidates],
+            keys=[mapper(candidate) for candidate in candidates],
+        )
+        _fuzzy_indexes[cache_key] = index
+        if len(_fuzzy_indexes) > _FUZZY_INDEX_CACHE_SIZE:
+            _fuzzy_indexes.popitem(last=False)
+    _fuzzy_indexes.move_to_end(cache_key)
+    return index
+
+
 def find_similar(
     xs: Iterable[str], key: str, mapper: Callable[[str], str] = lambda x: x
 ) -> tuple[str | None, float | None]:
-    if len([*xs]) == 0:
+    matches = fuzzy_index(xs, mapper).top_k(key, k=1)
+    if len(matches) == 0:
         return None, None
 
-    similarities: list[tuple[str, float]] = []
-    for app in xs:
-        similarities.append((app, levenshtein_distance(key, mapper(app))))
+    return matches[0]
+
+
+def split_sentences(text: str) -> tuple[list[str], str]:
+    parts = _SENTENCE_BOUNDARY.split(text)
+    sentences = [part.strip() for part in parts[:-1] if part.strip()]
+    return sentences, parts[-1]
+
+
+class TTLCache:
+    def __init__(self, *, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[Any, float, float]] = OrderedDict()
+
+    def get_with_age(self, key: Hashable) -> tuple[Any, float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        value, stored_at, _ = entry
+        return value, time.monotonic() - stored_at
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at, ttl = entry
+        if time.monotonic() - stored_at > ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, *, ttl: float | None = None):
+        self._entries[key] = (value, time.monotonic(), self.ttl if ttl is None else ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]):
+        for key in [*self._entries.keys()]:
+            if predicate(key):
+                self._entries.pop(key, None)
+
 
-    return sorted(similarities, key=lambda x: x[1])[-1]
+def normalize_utterance(prompt: str, *, assistant_name: str) -> list[str]:
+    tokens = re.findall(r"[a-z0-9']+", prompt.lower())
+    name = assistant_name.lower()
+    if name in tokens[:4]:
+        tokens = tokens[tokens.index(name) + 1 :]
+    if name in tokens[-3:]:
+        tokens = tokens[: len(tokens) - 1 - tokens[::-1].index(name)]
+    return tokens
@@ -47,6 +47,7 @@ function App() {
         whenDone: listen,
       });
     }
+    if (history.length === 0) return;
 
     const { llmMessages, llmTools } = history.reduce<{
       llmMessages: Array<{
@@ -78,10 +79,19 @@ function App() {
           setSpeechAudioCtxPool((prev) => [...prev, ctx]),
         whenDone: listen,
       }),
-      executeSideEffectsDrivenByLLM(llmTools),
+      executeSideEffectsDrivenByLLM(llmTools, announceJobResult),
     ]);
   };
 
+  const announceJobResult = async (result: string) => {
+    await STT.stopListening();
+    await speak(result, {
+      onSpeechAudioCtxCreated: (ctx) =>
+        setSpeechAudioCtxPool((prev) => [...prev, ctx]),
+      whenDone: listen,
+    });
+  };
+
   const listen = async () => {
     // Using while(true) to not exceed the call stack size
     while (true) {
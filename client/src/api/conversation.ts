@@ -1,6 +1,7 @@
-import { CapacitorHttp } from "@capacitor/core";
+import { CapacitorHttp, HttpResponse } from "@capacitor/core";
 import { SECRET } from "@/constants";
 import { BASE_URL } from ".";
+import { sleep } from "@/utils";
 import { z } from "zod";
 
 export const endpoint = "/api/conversation";
@@ -10,17 +11,82 @@ export const conversationResponseSchema = z.array(z.object({
   content: z.string().nullish(),
 }))
 
-export const getConversation = async (prompt: string, metadata: object) => {
+type Metadata = Record<string, unknown>;
+
+let metadataVersion: string | null = null;
+let syncedMetadata: Record<string, string> = {};
+
+const isRecord = (value: unknown): value is Record<string, unknown> =>
+  typeof value === "object" && value !== null && !Array.isArray(value);
+
+const metadataDelta = (metadata: Metadata) => {
+  if (!metadataVersion) return metadata;
+
+  const delta: Metadata = {};
+  for (const [name, value] of Object.entries(metadata)) {
+    const serialized = JSON.stringify(value);
+    if (syncedMetadata[name] === serialized) continue;
+
+    const previous = syncedMetadata[name] ? JSON.parse(syncedMetadata[name]) : undefined;
+    if (!isRecord(previous) || !isRecord(value)) {
+      delta[name] = value;
+      continue;
+    }
+    delta[name] = {
+      $upsert: Object.fromEntries(
+        Object.entries(value).filter(
+          ([key, item]) => JSON.stringify(previous[key]) !== JSON.stringify(item),
+        ),
+      ),
+      $remove: Object.keys(previous).filter((key) => !(key in value)),
+    };
+  }
+  return delta;
+};
+
+const responseHeader = (response: HttpResponse, name: string) =>
+  Object.entries(response.headers ?? {}).find(
+    ([key]) => key.toLowerCase() === name,
+  )?.[1] ?? null;
+
+const postConversation = (prompt: string, metadata: Metadata) =>
+  CapacitorHttp.post({
+    url: `${BASE_URL}${endpoint}`,
+    data: JSON.stringify({
+      prompt,
+      metadata: metadataDelta(metadata),
+      metadata_version: metadataVersion,
+      response: "final",
+    }),
+    headers: {
+      "Content-Type": "application/json",
+      "x-secret": SECRET,
+    },
+  });
+
+export const getConversation = async (prompt: string, metadata: Metadata) => {
   try {
-    const response = await CapacitorHttp.post({
-      url: `${BASE_URL}${endpoint}`,
-      data: JSON.stringify({ prompt, metadata }),
-      headers: {
-        "Content-Type": "application/json",
-        "x-secret": SECRET,
-      },
-    });
-    const { data, error } = await conversationResponseSchema.safeParseAsync(JSON.parse(response.data));
+    let response = await postConversation(prompt, metadata);
+    if (response.status === 429) {
+      const retryAfter = Number(responseHeader(response, "retry-after") ?? 1);
+      await sleep(retryAfter * 1000);
+      response = await postConversation(prompt, metadata);
+    }
+    if (response.status === 409) {
+      metadataVersion = null;
+      response = await postConversation(prompt, metadata);
+    }
+
+    metadataVersion = responseHeader(response, "x-metadata-version");
+    syncedMetadata = Object.fromEntries(
+      Object.entries(metadata).map(([name, value]) => [name, JSON.stringify(value)]),
+    );
+    // A newer utterance interrupted this turn, so there is nothing to say
+    if (response.status === 204) return [];
+
+    const { data, error } = await conversationResponseSchema.safeParseAsync(
+      typeof response.data === "string" ? JSON.parse(response.data) : response.data,
+    );
     if (error) {
       console.error(error);
       return null;
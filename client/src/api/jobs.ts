@@ -0,0 +1,40 @@
+import { CapacitorHttp } from "@capacitor/core";
+import { SECRET } from "@/constants";
+import { BASE_URL } from ".";
+import { z } from "zod";
+
+export const endpoint = "/api/jobs";
+
+export const backgroundJobSchema = z.object({
+  archetype: z.literal("background-job"),
+  job_id: z.string(),
+});
+
+export const jobSchema = z.object({
+  id: z.string(),
+  status: z.enum(["queued", "running", "done", "failed"]),
+  task: z.string(),
+  result: z.string().nullish(),
+  error: z.string().nullish(),
+});
+
+export const waitForJob = async (jobId: string) => {
+  // Long-polls until the job is finished; each request waits up to 30 seconds server-side
+  while (true) {
+    try {
+      const response = await CapacitorHttp.get({
+        url: `${BASE_URL}${endpoint}/${jobId}`,
+        params: { wait: "30" },
+        headers: { "x-secret": SECRET },
+      });
+      if (response.status === 404) return null;
+
+      const data = typeof response.data === "string" ? JSON.parse(response.data) : response.data;
+      const job = jobSchema.parse(data);
+      if (job.status === "done" || job.status === "failed") return job;
+    } catch (err) {
+      console.error(err);
+      return null;
+    }
+  }
+};
@@ -1,9 +1,21 @@
 import { frontendCapabilitySchema, handleFrontendCapabilities } from "@/agentic-frontend-capabilities";
+import { backgroundJobSchema, waitForJob } from "@/api/jobs";
 
-export const executeSideEffectsDrivenByLLM = async (llmTools: Array<{ role: "tool", content: string }>) => {
+export const executeSideEffectsDrivenByLLM = async (
+  llmTools: Array<{ role: "tool", content: string }>,
+  announce: (text: string) => Promise<void>,
+) => {
   for await (const tool of llmTools) {
     try {
       const json = JSON.parse(tool.content);
+      const backgroundJob = backgroundJobSchema.safeParse(json);
+      if (backgroundJob.success) {
+        waitForJob(backgroundJob.data.job_id).then((job) => {
+          if (job?.result) return announce(job.result);
+          if (job) return announce("Sorry, I couldn't work that one out.");
+        });
+        continue;
+      }
       const frontendCapability = frontendCapabilitySchema.parse(json);
       await handleFrontendCapabilities(frontendCapability);
     } catch(err) {